@@ -4,18 +4,441 @@ OmniFocus MCP Server
 A Python-based MCP server for managing OmniFocus tasks via OmniJS.
 """
 
-from mcp.server.fastmcp import FastMCP
+from __future__ import annotations
+
 import subprocess
+import io
+import tempfile
 import json
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+import re
+import threading
+import queue
+import atexit
+import functools
+import hashlib
+import inspect
+import time
+from collections import OrderedDict
+from string import Template
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Optional, List, Dict, Any, Tuple, Callable, Union, Iterator, IO
+from datetime import datetime, timedelta, timezone
+
+try:
+    from ScriptingBridge import SBApplication
+except ImportError:  # PyObjC is optional; the osascript worker is used instead
+    SBApplication = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib json module is used instead
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; ScriptingBridge replies are then parsed whole
+    ijson = None
+
+# Tools are collected here and only registered with FastMCP when the server
+# is first needed, so importing this module does not pull in the MCP stack.
+_TOOLS: List[Callable[..., Any]] = []
+_server = None
+_server_lock = threading.Lock()
+
+
+def _tool() -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Marks a function as an MCP tool; the function itself is returned unchanged."""
+    def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+        _TOOLS.append(fn)
+        return fn
+    return register
+
+
+def _get_server():
+    """Returns the FastMCP server, creating it and registering the tools on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            from mcp.server.fastmcp import FastMCP
+
+            server = FastMCP("omnifocus-mcp", "A comprehensive MCP server for managing OmniFocus tasks")
+            for fn in _TOOLS:
+                server.tool()(fn)
+            _server = server
+        return _server
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `omnifocus_server.mcp` (used by `mcp dev`) working without
+    # constructing the server at import time.
+    if name == "mcp":
+        return _get_server()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    """Parses a JSON reply, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serializes arguments for embedding in OmniJS, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+# JavaScript literals for Python booleans, used when rendering scripts
+_JS_BOOL = {True: "true", False: "false"}
+
+
+# Results with more items than this are streamed back in several frames
+_STREAM_CHUNK = 256
+
+# How much of a dead worker's stderr is quoted in the error message
+_STDERR_TAIL = 4096
+
+# JXA program run by the persistent osascript worker. It reads one JSON-encoded
+# OmniJS snippet per line from stdin, evaluates it inside OmniFocus and writes
+# one JSON reply per line to stdout (console.log goes to stderr under osascript).
+# Large lists, and the rows of large pack() tables, are sent as a header frame
+# with the rest of the result, then {chunk: [...]} frames, then {end: true}.
+_WORKER_JXA = """
+ObjC.import('Foundation');
+const app = Application('OmniFocus');
+const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+const CHUNK = """ + str(_STREAM_CHUNK) + """;
+
+function reply(obj) {
+    stdout.writeData($(JSON.stringify(obj) + '\\n').dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function send(result) {
+    const isList = Array.isArray(result);
+    const items = isList ? result : (result && Array.isArray(result.rows) ? result.rows : null);
+    if (!items || items.length <= CHUNK) {
+        reply({ ok: true, result: result });
+        return;
+    }
+    if (isList) {
+        reply({ ok: true, stream: 'list' });
+    } else {
+        reply({ ok: true, stream: 'rows', result: Object.assign({}, result, { rows: [] }) });
+    }
+    for (let i = 0; i < items.length; i += CHUNK) {
+        reply({ chunk: items.slice(i, i + CHUNK) });
+    }
+    reply({ end: true });
+}
+
+let buffer = '';
+while (true) {
+    const data = stdin.availableData;
+    if (data.length === 0) break;
+    buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    let newline;
+    while ((newline = buffer.indexOf('\\n')) >= 0) {
+        const line = buffer.slice(0, newline);
+        buffer = buffer.slice(newline + 1);
+        if (!line) continue;
+        try {
+            send(app.evaluateJavascript(JSON.parse(line)));
+        } catch (err) {
+            reply({ error: err.toString() });
+        }
+    }
+}
+"""
+
+
+class _OsascriptWorker:
+    """
+    A long-lived osascript process that evaluates OmniJS snippets on demand.
+    
+    Spawning osascript and attaching to OmniFocus costs far more than the
+    snippets themselves, so one process is kept alive and fed requests over
+    a line-based JSON protocol. Requests are ASCII-only (json.dumps escapes
+    everything else), which keeps line splitting safe on the JXA side.
+    """
+
+    def __init__(self) -> None:
+        self._proc: Optional[subprocess.Popen] = None
+        self._stderr: Optional[IO[bytes]] = None
+        self._lock = threading.Lock()
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _spawn(self) -> None:
+        # stderr goes to a file rather than a pipe: nothing reads it while the
+        # worker is healthy, and a full pipe would block the worker for good
+        self._close_stderr()
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(
+            ["/usr/bin/osascript", "-l", "JavaScript", "-e", _WORKER_JXA],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+        )
+
+    def _close_stderr(self) -> None:
+        if self._stderr is not None:
+            self._stderr.close()
+            self._stderr = None
+
+    def _stderr_tail(self) -> str:
+        """Returns the last few KB the worker wrote to stderr."""
+        if self._stderr is None:
+            return ""
+        size = self._stderr.seek(0, io.SEEK_END)
+        self._stderr.seek(max(0, size - _STDERR_TAIL))
+        return self._stderr.read().decode(errors="replace").strip()
+
+    def _reap(self) -> str:
+        """Waits for a dead worker and returns the tail of what it wrote to stderr."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return "worker not running"
+        proc.kill()
+        proc.wait()
+        stderr = self._stderr_tail()
+        self._close_stderr()
+        return stderr or f"worker exited with {proc.returncode}"
+
+    def evaluate(self, omnijs_code: str) -> Any:
+        """
+        Sends one OmniJS snippet to the worker and waits for its reply.
+        
+        A worker found dead before the request is sent is respawned
+        transparently. A worker that dies while a request is in flight is
+        not retried, since the snippet may already have modified the database.
+        """
+        with self._lock:
+            self._send(omnijs_code)
+            return self._read_reply()
+
+    def stream(self, omnijs_code: str) -> Iterator[Any]:
+        """
+        Like evaluate, but yields the items of a list result as they arrive.
+        
+        Each streamed chunk is parsed on its own, so a large result is never
+        held as one reply string. The worker stays reserved until the
+        generator is exhausted or closed; closing it early drains the rest.
+        A non-list result is yielded as a single item.
+        """
+        with self._lock:
+            self._send(omnijs_code)
+            reply = self._read_frame()
+            if "error" in reply:
+                raise RuntimeError(f"OmniJS execution failed: {reply['error']}")
+            if reply.get("stream") != "list":
+                result = self._finish_reply(reply)
+                yield from (result if isinstance(result, list) else [result])
+                return
+            
+            chunks = self._chunks()
+            try:
+                for chunk in chunks:
+                    yield from chunk
+            finally:
+                try:
+                    for _ in chunks:
+                        pass
+                except RuntimeError:
+                    # The caller stopped reading; a failure in the unread rest is moot
+                    pass
+
+    def _send(self, omnijs_code: str) -> None:
+        # Stdlib json on purpose: its ASCII-only output is what makes the
+        # line splitting on the JXA side safe
+        request = (json.dumps(omnijs_code) + "\n").encode()
+        for _ in range(2):
+            if not self._alive():
+                self._spawn()
+            try:
+                self._proc.stdin.write(request)
+                self._proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self._reap()
+                continue
+            return
+        raise RuntimeError("OmniJS execution failed: could not start osascript worker")
+
+    def _read_frame(self) -> Dict[str, Any]:
+        line = self._proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"OmniJS execution failed: {self._reap()}")
+        return _json_loads(line)
+
+    def _read_reply(self) -> Any:
+        """Reads one reply, reassembling it if it was streamed in chunks."""
+        reply = self._read_frame()
+        if "error" in reply:
+            raise RuntimeError(f"OmniJS execution failed: {reply['error']}")
+        return self._finish_reply(reply)
+
+    def _finish_reply(self, reply: Dict[str, Any]) -> Any:
+        if "stream" not in reply:
+            return reply.get("result")
+
+        items: List[Any] = []
+        for chunk in self._chunks():
+            items.extend(chunk)
+        if reply["stream"] == "list":
+            return items
+        result = reply["result"]
+        result["rows"] = items
+        return result
+
+    def _chunks(self) -> Iterator[List[Any]]:
+        """
+        Yields the chunk frames of a streamed reply up to its end frame.
+        
+        The worker sends an error frame instead when the snippet fails
+        partway through sending, which ends the stream with a RuntimeError.
+        """
+        while True:
+            frame = self._read_frame()
+            if "chunk" in frame:
+                yield frame["chunk"]
+            elif frame.get("end"):
+                return
+            else:
+                raise RuntimeError(f"OmniJS execution failed: {frame.get('error', frame)}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._alive():
+                self._proc.stdin.close()
+                try:
+                    self._proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+            self._proc = None
+            self._close_stderr()
+
+
+class _WorkerPool:
+    """
+    A fixed set of osascript workers shared between threads.
+    
+    OmniFocus runs evaluateJavascript on its main thread, so more than a
+    couple of workers buys nothing; two let one request's JSON be parsed
+    here while the next is already executing in OmniFocus. Workers are
+    spawned lazily, and the most recently used (warmest) one is preferred.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._workers = [_OsascriptWorker() for _ in range(size)]
+        self._idle: "queue.LifoQueue[_OsascriptWorker]" = queue.LifoQueue()
+        for worker in reversed(self._workers):
+            self._idle.put(worker)
+
+    def evaluate(self, omnijs_code: str) -> Any:
+        worker = self._idle.get()
+        try:
+            return worker.evaluate(omnijs_code)
+        finally:
+            self._idle.put(worker)
+
+    def stream(self, omnijs_code: str) -> Iterator[Any]:
+        worker = self._idle.get()
+        try:
+            yield from worker.stream(omnijs_code)
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
 
-mcp = FastMCP("omnifocus-mcp", "A comprehensive MCP server for managing OmniFocus tasks")
+
+_POOL_SIZE = 2
+
+_workers = _WorkerPool(_POOL_SIZE)
+atexit.register(_workers.close)
+
+
+_OMNIFOCUS_BUNDLE_IDS = (
+    "com.omnigroup.OmniFocus4",
+    "com.omnigroup.OmniFocus3",
+    "com.omnigroup.OmniFocus3.MacAppStore",
+)
+
+
+class _ScriptingBridgeBackend:
+    """
+    Evaluates OmniJS in-process through ScriptingBridge.
+    
+    This skips the osascript hop entirely: each call is a single Apple Event
+    to OmniFocus over a connection that stays warm between calls. The result
+    is stringified inside OmniJS so that it crosses the bridge as one string
+    rather than as a tree of bridged Foundation objects.
+    """
+
+    # Fixed reply envelope; only the snippet between the two halves varies
+    _HEAD = "(() => { try { return JSON.stringify({ ok: true, result: ("
+    _TAIL = ") }); } catch (err) { return JSON.stringify({ error: err.toString() }); } })()"
+
+    # How a successful list reply starts; JSON.stringify adds no whitespace
+    _LIST_PREFIX = '{"ok":true,"result":['
+
+    def __init__(self, app: Any) -> None:
+        self._app = app
+        self._lock = threading.Lock()
+
+    def _call(self, omnijs_code: str) -> str:
+        wrapped = self._HEAD + omnijs_code + self._TAIL
+        with self._lock:
+            raw = self._app.evaluateJavascript_(wrapped)
+        if raw is None:
+            raise RuntimeError("OmniJS execution failed: no reply from OmniFocus")
+        return str(raw)
+
+    def evaluate(self, omnijs_code: str) -> Any:
+        reply = _json_loads(self._call(omnijs_code))
+        if "error" in reply:
+            raise RuntimeError(f"OmniJS execution failed: {reply['error']}")
+        return reply.get("result")
+
+    def stream(self, omnijs_code: str) -> Iterator[Any]:
+        # An Apple Event reply arrives in one piece, but with ijson its list
+        # items are still decoded one at a time, so the whole parsed result
+        # never has to exist at once.
+        text = self._call(omnijs_code)
+        if ijson is None or not text.startswith(self._LIST_PREFIX):
+            reply = _json_loads(text)
+            if "error" in reply:
+                raise RuntimeError(f"OmniJS execution failed: {reply['error']}")
+            result = reply.get("result")
+            yield from (result if isinstance(result, list) else [result])
+            return
+        
+        yield from ijson.items(io.BytesIO(text.encode()), "result.item", use_float=True)
+
+
+def _connect_scripting_bridge() -> Optional[_ScriptingBridgeBackend]:
+    if SBApplication is None:
+        return None
+    for bundle_id in _OMNIFOCUS_BUNDLE_IDS:
+        app = SBApplication.applicationWithBundleIdentifier_(bundle_id)
+        if app is not None:
+            return _ScriptingBridgeBackend(app)
+    return None
+
+
+_bridge = _connect_scripting_bridge()
 
 
 def run_omnifocus_omnijs(omnijs_code: str) -> Any:
     """
-    Executes an OmniJS script in OmniFocus via AppleScript and returns the result.
+    Executes an OmniJS script in OmniFocus and returns the result.
+    
+    Scripts run in-process through ScriptingBridge when PyObjC is installed,
+    and through the persistent osascript worker otherwise.
     
     Args:
         omnijs_code: The OmniJS code to execute in OmniFocus.
@@ -26,40 +449,463 @@ def run_omnifocus_omnijs(omnijs_code: str) -> Any:
     Raises:
         RuntimeError: If the script execution fails.
     """
-    try:
-        # Use JXA (JavaScript for Automation) to run OmniJS in OmniFocus
-        # Escape backticks in the OmniJS code
-        escaped_code = omnijs_code.replace('`', '\\`')
-        jxa_wrapper = f"""
-        const app = Application('OmniFocus');
-        const result = app.evaluateJavascript(`{escaped_code}`);
-        JSON.stringify(result);
-        """
+    return (_bridge or _workers).evaluate(omnijs_code)
+
+
+def run_omnifocus_omnijs_stream(omnijs_code: str) -> Iterator[Any]:
+    """
+    Executes an OmniJS script that returns a list and yields its items.
+    
+    Through the osascript worker, items are decoded chunk by chunk as
+    OmniFocus sends them instead of after the whole reply has arrived.
+    Consume or close the iterator promptly: it holds a worker until then.
+    
+    Args:
+        omnijs_code: The OmniJS code to execute in OmniFocus.
         
-        proc = subprocess.run(
-            ["/usr/bin/osascript", "-l", "JavaScript"],
-            input=jxa_wrapper,
-            capture_output=True,
-            text=True,
-            check=True,
-        )
+    Yields:
+        Each item of the result list (a non-list result is yielded once).
         
-        # Parse the JSON output
-        if proc.stdout.strip():
-            try:
-                return json.loads(proc.stdout.strip())
-            except json.JSONDecodeError:
-                return proc.stdout.strip()
-        return None
+    Raises:
+        RuntimeError: If the script execution fails.
+    """
+    return (_bridge or _workers).stream(omnijs_code)
+
+
+def run_omnifocus_omnijs_async(omnijs_code: str) -> "Future[Any]":
+    """
+    Schedules an OmniJS script on a background thread.
+    
+    Independent queries submitted back to back overlap on the worker pool
+    (and coalesce into batches beyond that); futures complete with the same
+    value or exception run_omnifocus_omnijs would have produced.
+    
+    Args:
+        omnijs_code: The OmniJS code to execute in OmniFocus.
         
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.strip() if e.stderr else str(e)
-        raise RuntimeError(f"OmniJS execution failed: {error_msg}")
+    Returns:
+        A Future resolving to the parsed result.
+    """
+    return _executor.submit(_submit, omnijs_code)
+
+
+def _batch_outcomes(codes: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evaluates several OmniJS expressions in one round trip.
+    
+    Each snippet is isolated in its own try/catch so that one failure does
+    not discard the others; the returned list holds one {ok, result} or
+    {error} record per snippet, in order.
+    """
+    wrapped = ",\n".join(
+        f"(() => {{ try {{ return {{ ok: true, result: ({code}) }}; }} "
+        f"catch (err) {{ return {{ error: err.toString() }}; }} }})()"
+        for code in codes
+    )
+    outcomes = run_omnifocus_omnijs(f"[{wrapped}]")
+    if not isinstance(outcomes, list) or len(outcomes) != len(codes):
+        raise RuntimeError(f"OmniJS execution failed: malformed batch result {outcomes!r}")
+    return outcomes
+
+
+def run_omnifocus_omnijs_batch(codes: List[str]) -> List[Any]:
+    """
+    Executes several OmniJS expressions in a single OmniFocus round trip.
+    
+    Args:
+        codes: OmniJS expressions, e.g. "(() => { ... })()".
+        
+    Returns:
+        The parsed result of each expression, in order.
+        
+    Raises:
+        RuntimeError: If the batch, or any expression in it, fails.
+    """
+    results = []
+    for outcome in _batch_outcomes(codes):
+        if "error" in outcome:
+            raise RuntimeError(f"OmniJS execution failed: {outcome['error']}")
+        results.append(outcome.get("result"))
+    return results
+
+
+class _Coalescer:
+    """
+    Funnels concurrent snippet submissions into batched round trips.
+    
+    A caller that finds fewer than `max_flushers` round trips in flight
+    becomes a flusher and sends everything queued so far as one batch.
+    Callers arriving while every flusher is busy queue up and go out
+    together in the next batch, so a lone caller pays no extra latency
+    waiting for company.
+    """
+
+    def __init__(self, max_flushers: int = 1) -> None:
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Future]] = []
+        self._flushers = 0
+        self._max_flushers = max_flushers
+
+    def submit(self, omnijs_code: str) -> Any:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((omnijs_code, future))
+            leader = self._flushers < self._max_flushers
+            if leader:
+                self._flushers += 1
+        if leader:
+            self._drain()
+        return future.result()
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._flushers -= 1
+                    return
+            try:
+                if len(batch) == 1:
+                    outcomes = [{"ok": True, "result": run_omnifocus_omnijs(batch[0][0])}]
+                else:
+                    outcomes = _batch_outcomes([code for code, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), outcome in zip(batch, outcomes):
+                if "error" in outcome:
+                    future.set_exception(
+                        RuntimeError(f"OmniJS execution failed: {outcome['error']}")
+                    )
+                else:
+                    future.set_result(outcome.get("result"))
+
+
+_coalescer = _Coalescer(max_flushers=_POOL_SIZE)
+_submit = _coalescer.submit
+
+_executor = ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="omnijs")
+
+
+# OmniJS handlers installed once into OmniFocus's JavaScript context. Tools
+# that take arguments call them as __ofmcp_<hash>.<name>(JSON.parse("<args>")),
+# so the source OmniFocus has to compile per call is tiny and constant, and
+# arguments travel as JSON data instead of being spliced into code.
+_HANDLERS_BODY = """(() => {
+    const guard = fn => a => {
+        try {
+            return fn(a);
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    };
+
+    // Accepts anything Date understands; "null", "" or garbage clears the date
+    const parseDate = s => {
+        if (!s || s === 'null') return null;
+        const parsed = new Date(s);
+        return isNaN(parsed) ? null : parsed;
+    };
+
+    return {
+        getTask: guard(a => {
+            const task = Task.byIdentifier(a.id);
+            if (!task) {
+                return { error: "Task not found" };
+            }
+            return {
+                id: task.id.primaryKey,
+                name: task.name,
+                note: task.note || "",
+                completed: task.completed,
+                flagged: task.flagged,
+                project: task.containingProject ? task.containingProject.name : null,
+                tags: task.tags.map(t => t.name),
+                due: task.dueDate ? task.dueDate.toISOString() : null,
+                defer: task.deferDate ? task.deferDate.toISOString() : null,
+                estimated_minutes: task.estimatedMinutes,
+                completion_date: task.completionDate ? task.completionDate.toISOString() : null
+            };
+        }),
+
+        editTask: guard(a => {
+            const task = Task.byIdentifier(a.id);
+            if (!task) {
+                return { error: "Task not found" };
+            }
+            if ('name' in a) task.name = a.name;
+            if ('note' in a) task.note = a.note;
+            if ('flagged' in a) task.flagged = a.flagged;
+            if ('completed' in a) {
+                if (a.completed) task.markComplete();
+                else task.markIncomplete();
+            }
+            if ('due' in a) task.dueDate = parseDate(a.due);
+            if ('defer' in a) task.deferDate = parseDate(a.defer);
+            // IDs the caller already knows skip the byName scans; the
+            // name check catches IDs that went stale through a rename
+            const resolved = { project: {}, tag: {} };
+            if ('project' in a) {
+                if (a.project) {
+                    let proj = a.projectId ? Project.byIdentifier(a.projectId) : null;
+                    if (!proj || proj.name !== a.project) proj = flattenedProjects.byName(a.project);
+                    if (proj) {
+                        moveTasks([task], proj);
+                        resolved.project[a.project] = proj.id.primaryKey;
+                    }
+                } else {
+                    moveTasks([task], inbox.ending);
+                }
+            }
+            if ('tags' in a) {
+                const tagIds = a.tagIds || {};
+                task.clearTags();
+                task.addTags(a.tags.map(name => {
+                    let tag = tagIds[name] ? Tag.byIdentifier(tagIds[name]) : null;
+                    if (!tag || tag.name !== name) tag = flattenedTags.byName(name) || new Tag(name);
+                    resolved.tag[name] = tag.id.primaryKey;
+                    return tag;
+                }));
+            }
+            return {
+                success: true,
+                id: task.id.primaryKey,
+                name: task.name,
+                resolved: resolved
+            };
+        }),
+
+        completeTasks: guard(a => a.ids.map(id => {
+            try {
+                const task = Task.byIdentifier(id);
+                if (!task) {
+                    return { success: false, id: id, error: "Task not found" };
+                }
+                task.markComplete();
+                return { success: true, id: id, name: task.name };
+            } catch (err) {
+                return { success: false, id: id, error: err.toString() };
+            }
+        })),
+
+        removeTask: guard(a => {
+            const task = Task.byIdentifier(a.id);
+            if (!task) {
+                return { error: "Task not found" };
+            }
+            const name = task.name;
+            deleteObject(task);
+            return { success: true, name: name };
+        }),
+
+        removeProject: guard(a => {
+            const project = Project.byIdentifier(a.id);
+            if (!project) {
+                return { error: "Project not found" };
+            }
+            const name = project.name;
+            deleteObject(project);
+            return { success: true, name: name };
+        })
+    };
+})()"""
+
+# The global is named after a hash of the handlers, so handlers left in a
+# long-running OmniFocus by another build of this server are never reused
+_HANDLERS_GLOBAL = "__ofmcp_" + hashlib.sha256(_HANDLERS_BODY.encode()).hexdigest()[:8]
+_HANDLERS_JS = f"globalThis.{_HANDLERS_GLOBAL} = {_HANDLERS_BODY}"
+_HANDLERS_MISSING = "__ofmcp_missing__"
+
+
+def _call_handler(name: str, args: Dict[str, Any]) -> Any:
+    """
+    Invokes one of the _HANDLERS_JS handlers with JSON-encoded arguments.
+    
+    The handlers are installed lazily: the first call into a fresh OmniFocus
+    JavaScript context reports them missing and is re-sent together with
+    the bootstrap.
+    """
+    call = f"{_HANDLERS_GLOBAL}.{name}(JSON.parse({json.dumps(_json_dumps(args))}))"
+    result = _submit(
+        f"(typeof {_HANDLERS_GLOBAL} === 'undefined') ? {json.dumps(_HANDLERS_MISSING)} : {call}"
+    )
+    if result == _HANDLERS_MISSING:
+        result = _submit(f"({_HANDLERS_JS}, {call})")
+    return result
+
+
+# Project and tag name -> primaryKey cache, so handlers can use the O(1)
+# byIdentifier lookups instead of scanning by name. Entries expire after
+# _NAME_ID_TTL seconds; handlers also re-check the name, so a stale ID
+# falls back to a byName lookup instead of hitting the wrong object.
+# Entries also record whether the name was seen to be unique: only then
+# does the ID stand for every object of that name, as filters need.
+_NAME_ID_TTL = 300.0
+_NAME_ID_MAXSIZE = 1024
+_name_ids: "OrderedDict[Tuple[str, str], Tuple[float, str, bool]]" = OrderedDict()
+_name_ids_lock = threading.Lock()
+
+
+def _cached_id(kind: str, name: str, unique: bool = False) -> Optional[str]:
+    """
+    Returns the cached ID of a "project" or "tag" without a round trip.
+    
+    With `unique`, only IDs of names known to match a single object are
+    returned.
+    """
+    with _name_ids_lock:
+        hit = _name_ids.get((kind, name))
+        if hit is None or time.monotonic() - hit[0] >= _NAME_ID_TTL:
+            return None
+        if unique and not hit[2]:
+            return None
+        return hit[1]
+
+
+def _remember_ids(kind: str, ids: Dict[str, Optional[str]], unique: bool = False) -> None:
+    """
+    Caches name→ID pairs; a None ID marks a name shared by several objects.
+    
+    Pass `unique` when every object of each name was looked at, so a
+    single ID is known to be the only one.
+    """
+    now = time.monotonic()
+    with _name_ids_lock:
+        for name, obj_id in ids.items():
+            if obj_id is None:
+                _name_ids.pop((kind, name), None)
+                continue
+            _name_ids[(kind, name)] = (now, obj_id, unique)
+            _name_ids.move_to_end((kind, name))
+        while len(_name_ids) > _NAME_ID_MAXSIZE:
+            _name_ids.popitem(last=False)
+
+
+def _forget_ids(kind: str) -> None:
+    with _name_ids_lock:
+        for key in [key for key in _name_ids if key[0] == kind]:
+            del _name_ids[key]
+
+
+# Bumped by every mutating tool; part of every cache key, so a bump
+# invalidates all cached query results at once.
+_db_version = 0
+
+
+def _invalidate_caches() -> None:
+    global _db_version
+    _db_version += 1
+
+
+def _ttl_cache(ttl: float = 5.0, maxsize: int = 128) -> Callable:
+    """
+    Memoizes a read-only tool for `ttl` seconds, keyed by its arguments.
+    
+    Interactive clients often repeat the same query within a few seconds;
+    a short TTL bounds how stale a result can get when OmniFocus is edited
+    outside this server, and mutating tools invalidate via _db_version.
+    """
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = json.dumps([_db_version, bound.arguments], sort_keys=True, default=str)
+            now = time.monotonic()
+            with lock:
+                hit = entries.get(key)
+                if hit is not None and now - hit[0] < ttl:
+                    entries.move_to_end(key)
+                    return hit[1]
+
+            result = fn(*args, **kwargs)
+            with lock:
+                entries[key] = (now, result)
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+            return result
+
+        wrapper.cache_clear = entries.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+# OmniJS prelude shared by the list-returning query tools. pack() returns a
+# column-oriented {cols, rows} table, so field names cross the bridge once
+# per result instead of once per task; _unpack() restores the row dicts.
+_PACK_JS = """
+            const PROJ = {
+                id: t => t.id.primaryKey,
+                name: t => t.name,
+                note: t => t.note || "",
+                flagged: t => t.flagged,
+                completed: t => t.completed,
+                project: t => t.containingProject ? t.containingProject.name : null,
+                due: t => t.effectiveDueDate ? t.effectiveDueDate.toISOString() : null,
+                defer: t => t.effectiveDeferDate ? t.effectiveDeferDate.toISOString() : null,
+                tags: t => t.tags.map(tag => tag.name),
+                completion_time: t => t.completionDate ? t.completionDate.toISOString() : null,
+                type: t => t.flagged ? "flagged" : "due",
+                in_inbox: t => t.inInbox
+            };
+            const pack = (ts, cols) => ({
+                cols: cols,
+                rows: ts.map(t => cols.map(c => PROJ[c](t)))
+            });
+"""
+
+
+def _unpack(result: Any) -> List[Dict[str, Any]]:
+    """Expands a {cols, rows} table produced by the OmniJS pack() helper."""
+    if not isinstance(result, dict) or "cols" not in result:
+        return []
+    cols = result["cols"]
+    return [dict(zip(cols, row)) for row in result["rows"]]
+
+
+@functools.lru_cache(maxsize=64)
+def _build_snippet(template: Template, **args: str) -> str:
+    """
+    Fills a module-level snippet template, memoizing the result.
+    
+    Static snippets are plain module constants; this covers the ones that
+    take arguments, so repeated calls with the same arguments reuse one
+    string instead of rebuilding it.
+    """
+    return template.substitute(**args)
 
 
 # ===================== Task Creation Tools =====================
 
-@mcp.tool()
+_FOLD_NEWLINES = str.maketrans("\r\n", "  ")
+
+
+def _transport_line(task: Dict[str, Any]) -> str:
+    """
+    Builds one line of OmniFocus transport text from add_task-style fields.
+    
+    Newlines would start another task, so they are folded into spaces.
+    """
+    tokens = (
+        task["name"],
+        task.get("project") and f"::{task['project']}",
+        *(f"@{tag}" for tag in task.get("tags") or ()),
+        task.get("context") and f"@{task['context']}",
+        task.get("defer_date") and f"#{task['defer_date']}",
+        task.get("due_date") and f"#{task['due_date']}",
+        task.get("flagged") and "!",
+    )
+    return " ".join(token for token in tokens if token).translate(_FOLD_NEWLINES)
+
+
+@_tool()
 def add_task(
     name: str,
     note: Optional[str] = None,
@@ -86,36 +932,21 @@ def add_task(
     Returns:
         Success message with the created task ID.
     """
-    # Build transport text
-    parts = [name]
-    
-    if project:
-        parts.append(f"::{project}")
-    
-    if tags:
-        for tag in tags:
-            parts.append(f"@{tag}")
-    
-    # Add legacy context as a tag
-    if context:
-        parts.append(f"@{context}")
-    
-    if defer_date:
-        parts.append(f"#{defer_date}")
-    
-    if due_date:
-        parts.append(f"#{due_date}")
-    
-    if flagged:
-        parts.append("!")
-    
-    transport_text = " ".join(parts).replace("'", "\\'")
+    transport_text = json.dumps(_transport_line({
+        "name": name,
+        "project": project,
+        "tags": tags,
+        "context": context,
+        "defer_date": defer_date,
+        "due_date": due_date,
+        "flagged": flagged,
+    }))
     note_json = json.dumps(note if note else "")
     
     js_code = f"""
     (() => {{
         try {{
-            const tasks = Task.byParsingTransportText('{transport_text}');
+            const tasks = Task.byParsingTransportText({transport_text});
             if (!tasks || tasks.length === 0) {{
                 return {{ error: "Failed to create task from transport text" }};
             }}
@@ -134,14 +965,40 @@ def add_task(
     }})()
     """
     
-    result = run_omnifocus_omnijs(js_code)
+    result = _submit(js_code)
+    _invalidate_caches()
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to create task: {result['error']}")
     
     return f"Created task '{name}' with ID: {result.get('id', 'unknown')}"
 
 
-@mcp.tool()
+_REVIEW_UNIT_SECONDS = {
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+}
+_REVIEW_COUNT_RE = re.compile(r"\s*(\d+)")
+_REVIEW_UNIT_RE = re.compile(r"day|week|month", re.IGNORECASE)
+
+
+def _parse_review_interval(interval: str) -> Optional[int]:
+    """
+    Converts a review frequency such as "2 weeks" to seconds.
+    
+    The count is the leading integer, as parseInt would read it; a missing
+    or zero count means one unit, and a month counts as 30 days. Returns
+    None when no day/week/month unit is recognised.
+    """
+    unit = _REVIEW_UNIT_RE.search(interval)
+    if not unit:
+        return None
+    digits = _REVIEW_COUNT_RE.match(interval)
+    count = int(digits.group(1)) if digits else 0
+    return (count or 1) * _REVIEW_UNIT_SECONDS[unit.group().lower()]
+
+
+@_tool()
 def add_project(
     name: str,
     folder: Optional[str] = None,
@@ -162,36 +1019,30 @@ def add_project(
     Returns:
         Success message with the created project ID.
     """
-    name_escaped = name.replace("'", "\\'")
-    folder_escaped = folder.replace("'", "\\'") if folder else ""
+    name_json = json.dumps(name)
+    folder_json = json.dumps(folder or "")
+    review_seconds = _parse_review_interval(review_interval) if review_interval else None
+    review_update = (
+        f"project.reviewInterval = {review_seconds};" if review_seconds is not None else ""
+    )
     
     js_code = f"""
     (() => {{
         try {{
             let parent = null;
-            if ('{folder_escaped}') {{
-                parent = folders.byName['{folder_escaped}'] || new Folder('{folder_escaped}');
+            if ({folder_json}) {{
+                parent = folders.byName[{folder_json}] || new Folder({folder_json});
             }}
             
-            const project = new Project('{name_escaped}', parent);
+            const project = new Project({name_json}, parent);
             
-            if ({json.dumps(sequential)}) {{
+            if ({_JS_BOOL[sequential]}) {{
                 project.sequential = true;
             }}
             
-            if ('{review_interval or ""}') {{
-                // Parse review interval (simplified)
-                const interval = '{review_interval}';
-                if (interval.includes('week')) {{
-                    const weeks = parseInt(interval) || 1;
-                    project.reviewInterval = weeks * 7 * 24 * 60 * 60;
-                }} else if (interval.includes('day')) {{
-                    const days = parseInt(interval) || 1;
-                    project.reviewInterval = days * 24 * 60 * 60;
-                }}
-            }}
+            {review_update}
             
-            if ('{completion_rule or ""}' === 'last-action') {{
+            if ({json.dumps(completion_rule or "")} === 'last-action') {{
                 project.completedByChildren = true;
             }}
             
@@ -206,7 +1057,10 @@ def add_project(
     }})()
     """
     
-    result = run_omnifocus_omnijs(js_code)
+    result = _submit(js_code)
+    _invalidate_caches()
+    # The new project may share its name with one the cache holds as unique
+    _forget_ids("project")
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to create project: {result['error']}")
     
@@ -215,39 +1069,138 @@ def add_project(
 
 # ===================== Task Query Tools =====================
 
-@mcp.tool()
-def get_inbox_tasks() -> List[Dict[str, Any]]:
-    """
-    Returns all tasks in the OmniFocus inbox.
-    
-    Returns:
-        List of task dictionaries with id, name, note, and flagged status.
-    """
-    js_code = """
+# Local mirror of the tasks the inbox/flagged/forecast tools look at: every
+# remaining task plus completed inbox tasks, keyed by primaryKey. Refreshes
+# only pull tasks modified since the previous sync; a periodic full sync
+# also picks up changes that do not touch a task's own modification date,
+# such as a due date inherited from its project.
+_MIRROR_COLS = ["id", "name", "note", "flagged", "completed", "project", "due", "defer", "in_inbox"]
+_MIRROR_DELTA_INTERVAL = 1.0
+_MIRROR_FULL_INTERVAL = 60.0
+
+_MIRROR_SYNC_JS = Template("""
+    (() => {
+        try {""" + _PACK_JS + """
+            const since = $since;
+            const now = Date.now();
+            const changed = [];
+            let inScope = 0;
+            flattenedTasks.forEach(t => {
+                const wanted = !t.completed || t.inInbox;
+                if (wanted) inScope++;
+                if (since) {
+                    const modified = t.modified;
+                    if (modified && modified.getTime() < since) return;
+                } else if (!wanted) {
+                    return;
+                }
+                changed.push(t);
+            });
+            // The table stays at the top level so the worker can stream its rows
+            return Object.assign(pack(changed, $cols), { now: now, in_scope: inScope });
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """)
+
+_MIRROR_IDS_JS = """
     (() => {
         try {
-            const inboxTasks = inbox.flattenedTasks || inbox.tasks || [];
-            return inboxTasks.map(t => ({
-                id: t.id.primaryKey,
-                name: t.name,
-                note: t.note || "",
-                flagged: t.flagged,
-                completed: t.completed
-            }));
+            return flattenedTasks.filter(t => !t.completed || t.inInbox).map(t => t.id.primaryKey);
         } catch (err) {
             return { error: err.toString() };
         }
     })()
     """
-    
-    result = run_omnifocus_omnijs(js_code)
+
+_mirror: Dict[str, Dict[str, Any]] = {}
+_mirror_lock = threading.Lock()
+# (local monotonic time, OmniFocus clock in ms, _db_version) of the last sync
+_mirror_synced: Optional[Tuple[float, int, int]] = None
+_mirror_full_synced_at = 0.0
+
+
+def _expire_mirror() -> None:
+    """Makes the next sync a full one, for changes tasks' modified dates miss."""
+    global _mirror_full_synced_at
+    _mirror_full_synced_at = float("-inf")
+
+
+def _sync_delta() -> None:
+    """Brings _mirror up to date, pulling only tasks changed since the last sync."""
+    global _mirror_synced, _mirror_full_synced_at
+    
+    now = time.monotonic()
+    if _mirror_synced is not None:
+        synced_at, _, version = _mirror_synced
+        if version == _db_version and now - synced_at < _MIRROR_DELTA_INTERVAL:
+            return
+    
+    full = _mirror_synced is None or now - _mirror_full_synced_at >= _MIRROR_FULL_INTERVAL
+    since = 0 if full else _mirror_synced[1]
+    version = _db_version
+    result = _submit(
+        _build_snippet(_MIRROR_SYNC_JS, since=str(since), cols=_json_dumps(_MIRROR_COLS))
+    )
     if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to get inbox tasks: {result['error']}")
+        raise RuntimeError(f"Failed to sync tasks: {result['error']}")
+    
+    if full:
+        _mirror.clear()
+        _mirror_full_synced_at = now
+    for task in _unpack(result):
+        if task["completed"] and not task["in_inbox"]:
+            _mirror.pop(task["id"], None)
+        else:
+            # Lowercased once per change, so text searches need no folding
+            task["search"] = f"{task['name']}\x01{task['note'] or ''}".lower()
+            _mirror[task["id"]] = task
+    
+    # Deleted tasks never show up as modified; a size mismatch reveals them
+    if len(_mirror) != result["in_scope"]:
+        ids = _submit(_MIRROR_IDS_JS)
+        if isinstance(ids, dict) and ids.get("error"):
+            raise RuntimeError(f"Failed to sync tasks: {ids['error']}")
+        live = set(ids)
+        for task_id in [task_id for task_id in _mirror if task_id not in live]:
+            del _mirror[task_id]
+    
+    _mirror_synced = (now, result["now"], version)
+
+
+def _mirrored_tasks() -> List[Dict[str, Any]]:
+    """Syncs the mirror if it is due and returns a snapshot of its tasks."""
+    with _mirror_lock:
+        _sync_delta()
+        return list(_mirror.values())
+
+
+def _select(task: Dict[str, Any], cols: List[str]) -> Dict[str, Any]:
+    return {col: task[col] for col in cols}
+
+
+def _search_mirror(search_text: str) -> List[str]:
+    """Returns the IDs of remaining tasks whose name or note contains the text."""
+    needle = search_text.lower()
+    return [t["id"] for t in _mirrored_tasks() if not t["completed"] and needle in t["search"]]
+
+
+@_tool()
+@_ttl_cache()
+def get_inbox_tasks() -> List[Dict[str, Any]]:
+    """
+    Returns all tasks in the OmniFocus inbox.
     
-    return result if isinstance(result, list) else []
+    Returns:
+        List of task dictionaries with id, name, note, and flagged status.
+    """
+    cols = ["id", "name", "note", "flagged", "completed"]
+    return [_select(t, cols) for t in _mirrored_tasks() if t["in_inbox"]]
 
 
-@mcp.tool()
+@_tool()
+@_ttl_cache()
 def get_flagged_tasks() -> List[Dict[str, Any]]:
     """
     Returns all flagged tasks that are not completed.
@@ -255,31 +1208,12 @@ def get_flagged_tasks() -> List[Dict[str, Any]]:
     Returns:
         List of flagged task dictionaries.
     """
-    js_code = """
-    (() => {
-        try {
-            return flattenedTasks.filter(t => t.flagged && !t.completed).map(t => ({
-                id: t.id.primaryKey,
-                name: t.name,
-                project: t.containingProject ? t.containingProject.name : null,
-                due: t.effectiveDueDate ? t.effectiveDueDate.toISOString() : null,
-                defer: t.effectiveDeferDate ? t.effectiveDeferDate.toISOString() : null,
-                note: t.note || ""
-            }));
-        } catch (err) {
-            return { error: err.toString() };
-        }
-    })()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
-    if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to get flagged tasks: {result['error']}")
-    
-    return result if isinstance(result, list) else []
+    cols = ["id", "name", "project", "due", "defer", "note"]
+    return [_select(t, cols) for t in _mirrored_tasks() if t["flagged"] and not t["completed"]]
 
 
-@mcp.tool()
+@_tool()
+@_ttl_cache()
 def get_forecast_tasks() -> List[Dict[str, Any]]:
     """
     Returns tasks in the forecast view (due soon or flagged).
@@ -287,41 +1221,29 @@ def get_forecast_tasks() -> List[Dict[str, Any]]:
     Returns:
         List of forecast task dictionaries.
     """
-    js_code = """
-    (() => {
-        try {
-            const today = new Date();
-            const weekFromNow = new Date(today.getTime() + 7 * 24 * 60 * 60 * 1000);
-            
-            return flattenedTasks.filter(t => {
-                if (t.completed) return false;
-                if (t.flagged) return true;
-                if (t.effectiveDueDate) {
-                    return t.effectiveDueDate <= weekFromNow;
-                }
-                return false;
-            }).map(t => ({
-                id: t.id.primaryKey,
-                name: t.name,
-                project: t.containingProject ? t.containingProject.name : null,
-                due: t.effectiveDueDate ? t.effectiveDueDate.toISOString() : null,
-                flagged: t.flagged,
-                type: t.flagged ? "flagged" : "due"
-            }));
-        } catch (err) {
-            return { error: err.toString() };
-        }
-    })()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
-    if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to get forecast tasks: {result['error']}")
-    
-    return result if isinstance(result, list) else []
+    # Same format as OmniJS toISOString(), so due dates compare as strings
+    week_from_now = (datetime.now(timezone.utc) + timedelta(days=7)).strftime(
+        "%Y-%m-%dT%H:%M:%S.%f"
+    )[:-3] + "Z"
+    
+    forecast = []
+    for t in _mirrored_tasks():
+        if t["completed"]:
+            continue
+        if t["flagged"] or (t["due"] and t["due"] <= week_from_now):
+            forecast.append({
+                "id": t["id"],
+                "name": t["name"],
+                "project": t["project"],
+                "due": t["due"],
+                "flagged": t["flagged"],
+                "type": "flagged" if t["flagged"] else "due"
+            })
+    return forecast
 
 
-@mcp.tool()
+@_tool()
+@_ttl_cache()
 def get_task_by_id(task_id: str) -> Dict[str, Any]:
     """
     Fetches a specific task by its ID.
@@ -332,36 +1254,7 @@ def get_task_by_id(task_id: str) -> Dict[str, Any]:
     Returns:
         Task dictionary with full details.
     """
-    task_id_escaped = task_id.replace("'", "\\'")
-    
-    js_code = f"""
-    (() => {{
-        try {{
-            const task = Task.byIdentifier('{task_id_escaped}');
-            if (!task) {{
-                return {{ error: "Task not found" }};
-            }}
-            
-            return {{
-                id: task.id.primaryKey,
-                name: task.name,
-                note: task.note || "",
-                completed: task.completed,
-                flagged: task.flagged,
-                project: task.containingProject ? task.containingProject.name : null,
-                tags: task.tags.map(t => t.name),
-                due: task.dueDate ? task.dueDate.toISOString() : null,
-                defer: task.deferDate ? task.deferDate.toISOString() : null,
-                estimated_minutes: task.estimatedMinutes,
-                completion_date: task.completionDate ? task.completionDate.toISOString() : null
-            }};
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
+    result = _call_handler("getTask", {"id": task_id})
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to get task: {result['error']}")
     
@@ -372,7 +1265,28 @@ def get_task_by_id(task_id: str) -> Dict[str, Any]:
     return result
 
 
-@mcp.tool()
+_TASKS_BY_TAG_JS = Template("""
+    (() => {
+        try {""" + _PACK_JS + """
+            const tag = flattenedTags.byName($tag);
+            if (!tag) {
+                return [];
+            }
+            
+            // remainingTasks comes from OmniFocus's own index, so completed
+            // history on long-lived tags is never visited.
+            const remaining = tag.remainingTasks ||
+                tag.tasks.filter(t => !t.completed);
+            return pack(remaining, ["id", "name", "project", "due", "flagged", "note"]);
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """)
+
+
+@_tool()
+@_ttl_cache()
 def get_tasks_by_tag(tag_name: str) -> List[Dict[str, Any]]:
     """
     Returns all tasks with a specific tag.
@@ -383,38 +1297,50 @@ def get_tasks_by_tag(tag_name: str) -> List[Dict[str, Any]]:
     Returns:
         List of task dictionaries with the specified tag.
     """
-    tag_escaped = tag_name.replace("'", "\\'")
+    js_code = _build_snippet(_TASKS_BY_TAG_JS, tag=json.dumps(tag_name))
     
-    js_code = f"""
-    (() => {{
-        try {{
-            const tag = tags.byName['{tag_escaped}'];
-            if (!tag) {{
-                return [];
-            }}
-            
-            return tag.tasks.filter(t => !t.completed).map(t => ({{
-                id: t.id.primaryKey,
-                name: t.name,
-                project: t.containingProject ? t.containingProject.name : null,
-                due: t.effectiveDueDate ? t.effectiveDueDate.toISOString() : null,
-                flagged: t.flagged,
-                note: t.note || ""
-            }}));
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
+    result = _submit(js_code)
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to get tasks by tag: {result['error']}")
     
-    return result if isinstance(result, list) else []
+    return _unpack(result)
+
+
+# $start and $end are epoch milliseconds, so the per-task test is a
+# numeric compare with no Date coercion
+_COMPLETED_TODAY_JS = Template("""
+    (() => {
+        try {""" + _PACK_JS + """
+            const start = $start;
+            const end = $end;
+            
+            const completed = flattenedTasks.filter(t => {
+                if (!t.completed) return false;
+                const date = t.completionDate;
+                if (!date) return false;
+                const ms = date.getTime();
+                return ms >= start && ms < end;
+            });
+            return pack(completed, ["id", "name", "project", "completion_time", "tags"]);
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """)
+
+
+def _completed_today_js() -> str:
+    start, end = _today_bounds_ms()
+    return _build_snippet(_COMPLETED_TODAY_JS, start=start, end=end)
 
 
-@mcp.tool()
+def _check_completed(result: Any) -> List[Dict[str, Any]]:
+    if isinstance(result, dict) and result.get("error"):
+        raise RuntimeError(f"Failed to get completed tasks: {result['error']}")
+    return _unpack(result)
+
+
+@_tool()
 def get_completed_today() -> List[Dict[str, Any]]:
     """
     Returns tasks completed today.
@@ -422,41 +1348,112 @@ def get_completed_today() -> List[Dict[str, Any]]:
     Returns:
         List of task dictionaries completed today.
     """
-    js_code = """
+    cached = _dashboard_slice("completed_today")
+    if cached is not None:
+        return cached
+    
+    return _check_completed(_submit(_completed_today_js()))
+
+
+_DASHBOARD_JS = Template("""
     (() => {
-        try {
-            const today = new Date();
-            today.setHours(0, 0, 0, 0);
-            const tomorrow = new Date(today);
-            tomorrow.setDate(tomorrow.getDate() + 1);
+        try {""" + _PACK_JS + """
+            const start = $start;
+            const end = $end;
+            const weekFromNow = new Date(Date.now() + 7 * 24 * 60 * 60 * 1000);
             
-            return flattenedTasks.filter(t => {
-                return t.completed && 
-                       t.completionDate >= today && 
-                       t.completionDate < tomorrow;
-            }).map(t => ({
-                id: t.id.primaryKey,
-                name: t.name,
-                project: t.containingProject ? t.containingProject.name : null,
-                completion_time: t.completionDate.toISOString(),
-                tags: t.tags.map(tag => tag.name)
-            }));
+            const inboxTasks = [];
+            const flagged = [];
+            const forecast = [];
+            const completed = [];
+            
+            // One walk over the database feeds all four views
+            flattenedTasks.forEach(t => {
+                if (t.inInbox) inboxTasks.push(t);
+                if (t.completed) {
+                    const date = t.completionDate;
+                    const ms = date ? date.getTime() : NaN;
+                    if (ms >= start && ms < end) completed.push(t);
+                    return;
+                }
+                if (t.flagged) {
+                    flagged.push(t);
+                    forecast.push(t);
+                } else if (t.effectiveDueDate && t.effectiveDueDate <= weekFromNow) {
+                    forecast.push(t);
+                }
+            });
+            
+            return {
+                inbox: pack(inboxTasks, ["id", "name", "note", "flagged", "completed"]),
+                flagged: pack(flagged, ["id", "name", "project", "due", "defer", "note"]),
+                forecast: pack(forecast, ["id", "name", "project", "due", "flagged", "type"]),
+                completed_today: pack(completed, ["id", "name", "project", "completion_time", "tags"])
+            };
         } catch (err) {
             return { error: err.toString() };
         }
     })()
+    """)
+
+# Individual query tools reuse a dashboard fetched this recently
+_DASHBOARD_TTL = 5.0
+_last_dashboard: Optional[Tuple[float, int, Dict[str, List[Dict[str, Any]]]]] = None
+
+
+def _today_bounds_ms() -> Tuple[str, str]:
+    """Returns today's local-midnight bounds as epoch-millisecond strings."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today + timedelta(days=1)
+    return str(int(today.timestamp() * 1000)), str(int(tomorrow.timestamp() * 1000))
+
+
+def _dashboard_slice(view: str) -> Optional[List[Dict[str, Any]]]:
+    """Returns one view of a fresh get_dashboard() result, if there is one."""
+    if _last_dashboard is None:
+        return None
+    fetched, version, dashboard = _last_dashboard
+    if version != _db_version or time.monotonic() - fetched >= _DASHBOARD_TTL:
+        return None
+    return dashboard[view]
+
+
+@_tool()
+def get_dashboard() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns the inbox, flagged, forecast and completed-today views at once.
+    
+    This walks the database a single time, which is much cheaper than
+    calling the four individual tools back to back.
+    
+    Returns:
+        Dictionary with "inbox", "flagged", "forecast" and "completed_today"
+        lists, shaped like the results of the matching individual tools.
     """
+    global _last_dashboard
     
-    result = run_omnifocus_omnijs(js_code)
+    version = _db_version
+    start, end = _today_bounds_ms()
+    result = _submit(_build_snippet(_DASHBOARD_JS, start=start, end=end))
     if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to get completed tasks: {result['error']}")
+        raise RuntimeError(f"Failed to get dashboard: {result['error']}")
     
-    return result if isinstance(result, list) else []
+    dashboard = {view: _unpack(table) for view, table in result.items()}
+    _last_dashboard = (time.monotonic(), version, dashboard)
+    return dashboard
 
 
 # ===================== Task Editing Tools =====================
 
-@mcp.tool()
+_STATUS_MAP = {
+    "active": "Project.Status.Active",
+    "on-hold": "Project.Status.OnHold",
+    "dropped": "Project.Status.Dropped",
+    "done": "Project.Status.Done"
+}
+
+
+@_tool()
 def edit_task(
     task_id: str,
     name: Optional[str] = None,
@@ -485,122 +1482,50 @@ def edit_task(
     Returns:
         Success message.
     """
-    task_id_escaped = task_id.replace("'", "\\'")
-    updates = []
+    args: Dict[str, Any] = {"id": task_id}
     
     if name is not None:
-        updates.append(f"task.name = {json.dumps(name)};")
+        args["name"] = name
     
     if note is not None:
-        updates.append(f"task.note = {json.dumps(note)};")
+        args["note"] = note
     
     if flagged is not None:
-        updates.append(f"task.flagged = {json.dumps(flagged)};")
+        args["flagged"] = flagged
     
     if completed is not None:
-        updates.append(f"task.completed = {json.dumps(completed)};")
+        args["completed"] = completed
     
     if due_date is not None:
-        if due_date:
-            due_date_escaped = due_date.replace("'", "\\'")
-            updates.append(f"""
-                const dueStr = '{due_date_escaped}';
-                if (dueStr === 'null' || dueStr === '') {{
-                    task.dueDate = null;
-                }} else {{
-                    // Try to parse the date using various formats
-                    const parsed = new Date(dueStr);
-                    if (!isNaN(parsed)) {{
-                        task.dueDate = parsed;
-                    }} else {{
-                        // Handle relative dates like "2d", "tomorrow"
-                        // This would require more complex parsing
-                        task.dueDate = null;
-                    }}
-                }}
-            """)
-        else:
-            updates.append("task.dueDate = null;")
+        args["due"] = due_date
     
     if defer_date is not None:
-        if defer_date:
-            defer_date_escaped = defer_date.replace("'", "\\'")
-            updates.append(f"""
-                const deferStr = '{defer_date_escaped}';
-                if (deferStr === 'null' || deferStr === '') {{
-                    task.deferDate = null;
-                }} else {{
-                    const parsed = new Date(deferStr);
-                    if (!isNaN(parsed)) {{
-                        task.deferDate = parsed;
-                    }} else {{
-                        task.deferDate = null;
-                    }}
-                }}
-            """)
-        else:
-            updates.append("task.deferDate = null;")
+        args["defer"] = defer_date
     
     if project is not None:
-        project_escaped = project.replace("'", "\\'") if project else ""
-        updates.append(f"""
-            if ('{project_escaped}') {{
-                const proj = projects.byName['{project_escaped}'];
-                if (proj) {{
-                    task.containingProject = proj;
-                }}
-            }} else {{
-                task.containingProject = null;
-            }}
-        """)
+        args["project"] = project
+        if project:
+            args["projectId"] = _cached_id("project", project)
     
     if tags is not None:
-        tags_json = json.dumps(tags if tags else [])
-        updates.append(f"""
-            const tagNames = {tags_json};
-            const newTags = [];
-            tagNames.forEach(name => {{
-                let tag = tags.byName[name];
-                if (!tag) {{
-                    tag = new Tag(name);
-                }}
-                newTags.push(tag);
-            }});
-            task.tags = newTags;
-        """)
+        args["tags"] = tags
+        args["tagIds"] = {tag: _cached_id("tag", tag) for tag in tags}
     
-    if not updates:
+    if len(args) == 1:
         return "No updates specified"
     
-    js_code = f"""
-    (() => {{
-        try {{
-            const task = Task.byIdentifier('{task_id_escaped}');
-            if (!task) {{
-                return {{ error: "Task not found" }};
-            }}
-            
-            {' '.join(updates)}
-            
-            return {{
-                success: true,
-                id: task.id.primaryKey,
-                name: task.name
-            }};
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
+    result = _call_handler("editTask", args)
+    _invalidate_caches()
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to edit task: {result['error']}")
     
+    for kind, ids in result.get("resolved", {}).items():
+        _remember_ids(kind, ids)
+    
     return f"Successfully updated task: {result.get('name', 'unknown')}"
 
 
-@mcp.tool()
+@_tool()
 def edit_project(
     project_id: str,
     name: Optional[str] = None,
@@ -623,24 +1548,17 @@ def edit_project(
     Returns:
         Success message.
     """
-    project_id_escaped = project_id.replace("'", "\\'")
     updates = []
     
     if name is not None:
         updates.append(f"project.name = {json.dumps(name)};")
     
     if status is not None:
-        status_map = {
-            "active": "Project.Status.Active",
-            "on-hold": "Project.Status.OnHold",
-            "dropped": "Project.Status.Dropped",
-            "done": "Project.Status.Done"
-        }
-        if status.lower() in status_map:
-            updates.append(f"project.status = {status_map[status.lower()]};")
+        if status.lower() in _STATUS_MAP:
+            updates.append(f"project.status = {_STATUS_MAP[status.lower()]};")
     
     if sequential is not None:
-        updates.append(f"project.sequential = {json.dumps(sequential)};")
+        updates.append(f"project.sequential = {_JS_BOOL[sequential]};")
     
     if completion_rule is not None:
         if completion_rule == "last-action":
@@ -649,20 +1567,9 @@ def edit_project(
             updates.append("project.completedByChildren = false;")
     
     if review_interval is not None:
-        review_interval_escaped = review_interval.replace("'", "\\'")
-        updates.append(f"""
-            const interval = '{review_interval_escaped}';
-            if (interval.includes('week')) {{
-                const weeks = parseInt(interval) || 1;
-                project.reviewInterval = weeks * 7 * 24 * 60 * 60;
-            }} else if (interval.includes('day')) {{
-                const days = parseInt(interval) || 1;
-                project.reviewInterval = days * 24 * 60 * 60;
-            }} else if (interval.includes('month')) {{
-                const months = parseInt(interval) || 1;
-                project.reviewInterval = months * 30 * 24 * 60 * 60;
-            }}
-        """)
+        review_seconds = _parse_review_interval(review_interval)
+        if review_seconds is not None:
+            updates.append(f"project.reviewInterval = {review_seconds};")
     
     if not updates:
         return "No updates specified"
@@ -670,7 +1577,7 @@ def edit_project(
     js_code = f"""
     (() => {{
         try {{
-            const project = Project.byIdentifier('{project_id_escaped}');
+            const project = Project.byIdentifier({json.dumps(project_id)});
             if (!project) {{
                 return {{ error: "Project not found" }};
             }}
@@ -688,7 +1595,13 @@ def edit_project(
     }})()
     """
     
-    result = run_omnifocus_omnijs(js_code)
+    result = _submit(js_code)
+    _invalidate_caches()
+    if name is not None:
+        _forget_ids("project")
+    if name is not None or status is not None:
+        # Renaming or pausing a project leaves its tasks' modified dates alone
+        _expire_mirror()
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to edit project: {result['error']}")
     
@@ -697,7 +1610,7 @@ def edit_project(
 
 # ===================== Task Removal Tools =====================
 
-@mcp.tool()
+@_tool()
 def remove_task(task_id: str) -> str:
     """
     Removes a task from OmniFocus.
@@ -708,37 +1621,15 @@ def remove_task(task_id: str) -> str:
     Returns:
         Success message.
     """
-    task_id_escaped = task_id.replace("'", "\\'")
-    
-    js_code = f"""
-    (() => {{
-        try {{
-            const task = Task.byIdentifier('{task_id_escaped}');
-            if (!task) {{
-                return {{ error: "Task not found" }};
-            }}
-            
-            const name = task.name;
-            deleteObject(task);
-            
-            return {{
-                success: true,
-                name: name
-            }};
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
+    result = _call_handler("removeTask", {"id": task_id})
+    _invalidate_caches()
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to remove task: {result['error']}")
     
     return f"Successfully removed task: {result.get('name', 'unknown')}"
 
 
-@mcp.tool()
+@_tool()
 def remove_project(project_id: str) -> str:
     """
     Removes a project from OmniFocus.
@@ -749,30 +1640,9 @@ def remove_project(project_id: str) -> str:
     Returns:
         Success message.
     """
-    project_id_escaped = project_id.replace("'", "\\'")
-    
-    js_code = f"""
-    (() => {{
-        try {{
-            const project = Project.byIdentifier('{project_id_escaped}');
-            if (!project) {{
-                return {{ error: "Project not found" }};
-            }}
-            
-            const name = project.name;
-            deleteObject(project);
-            
-            return {{
-                success: true,
-                name: name
-            }};
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
+    result = _call_handler("removeProject", {"id": project_id})
+    _invalidate_caches()
+    _forget_ids("project")
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to remove project: {result['error']}")
     
@@ -781,7 +1651,7 @@ def remove_project(project_id: str) -> str:
 
 # ===================== Batch Operations =====================
 
-@mcp.tool()
+@_tool()
 def batch_add_tasks(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Adds multiple tasks in a single operation.
@@ -792,72 +1662,93 @@ def batch_add_tasks(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
     Returns:
         Dictionary with success count and list of created task IDs.
     """
-    js_code = """
+    lines = []
+    notes = []
+    errors = []
+    for task in tasks:
+        if not task.get("name"):
+            errors.append({"name": task.get("name"), "error": "Task name is required"})
+            continue
+        lines.append(_transport_line(task))
+        notes.append(task.get("note") or "")
+    
+    results = []
+    if lines:
+        js_code = """
     (() => {
-        const results = [];
-        const tasksData = """ + json.dumps(tasks) + """;
+        const lines = """ + _json_dumps(lines) + """;
+        const notes = """ + _json_dumps(notes) + """;
+        const describe = task => ({
+            success: true,
+            id: task.id.primaryKey,
+            name: task.name
+        });
         
-        tasksData.forEach(taskData => {
-            try {
-                // Build transport text for each task
-                let parts = [taskData.name];
-                
-                if (taskData.project) parts.push(`::${taskData.project}`);
-                if (taskData.tags) {
-                    taskData.tags.forEach(tag => parts.push(`@${tag}`));
+        // One parse creates every task in a single database change
+        let created = null;
+        try {
+            created = Task.byParsingTransportText(lines.join("\\n"), false);
+        } catch (err) {
+            created = null;
+        }
+        
+        if (created && created.length === lines.length) {
+            return created.map((task, i) => {
+                if (notes[i]) {
+                    task.note = notes[i];
                 }
-                if (taskData.defer_date) parts.push(`#${taskData.defer_date}`);
-                if (taskData.due_date) parts.push(`#${taskData.due_date}`);
-                if (taskData.flagged) parts.push("!");
-                
-                const transportText = parts.join(" ");
-                const tasks = Task.byParsingTransportText(transportText);
-                
+                return describe(task);
+            });
+        }
+        
+        if (created && created.length > 0) {
+            // Tasks exist but cannot be matched back to their input lines
+            const results = created.map(describe);
+            results.push({
+                success: false,
+                error: `Parsed ${created.length} tasks from ${lines.length} lines; notes were not applied`,
+                name: null
+            });
+            return results;
+        }
+        
+        // Nothing was created; parse line by line to isolate the failure
+        return lines.map((line, i) => {
+            try {
+                const tasks = Task.byParsingTransportText(line, true);
                 if (tasks && tasks.length > 0) {
-                    const task = tasks[0];
-                    if (taskData.note) {
-                        task.note = taskData.note;
+                    if (notes[i]) {
+                        tasks[0].note = notes[i];
                     }
-                    results.push({
-                        success: true,
-                        id: task.id.primaryKey,
-                        name: task.name
-                    });
-                } else {
-                    results.push({
-                        success: false,
-                        error: "Failed to create task",
-                        name: taskData.name
-                    });
+                    return describe(tasks[0]);
                 }
+                return { success: false, error: "Failed to create task", name: line };
             } catch (err) {
-                results.push({
-                    success: false,
-                    error: err.toString(),
-                    name: taskData.name
-                });
+                return { success: false, error: err.toString(), name: line };
             }
         });
-        
-        return results;
     })()
     """
+        
+        results = _submit(js_code)
+        _invalidate_caches()
     
-    result = run_omnifocus_omnijs(js_code)
-    
-    successful = [r for r in result if r.get("success")]
-    failed = [r for r in result if not r.get("success")]
+    successful = [r for r in results if r.get("success")]
+    errors += [
+        {"name": r["name"], "error": r.get("error", "Unknown error")}
+        for r in results if not r.get("success")
+    ]
     
     return {
         "total": len(tasks),
         "successful": len(successful),
-        "failed": len(failed),
+        "failed": len(errors),
         "created_ids": [r["id"] for r in successful],
-        "errors": [{"name": r["name"], "error": r.get("error", "Unknown error")} for r in failed]
+        "errors": errors
     }
 
 
-@mcp.tool()
+@_tool()
 def batch_complete_tasks(task_ids: List[str]) -> Dict[str, Any]:
     """
     Marks multiple tasks as completed.
@@ -868,48 +1759,19 @@ def batch_complete_tasks(task_ids: List[str]) -> Dict[str, Any]:
     Returns:
         Dictionary with completion statistics.
     """
-    js_code = f"""
-    (() => {{
-        const taskIds = {json.dumps(task_ids)};
-        const results = [];
-        
-        taskIds.forEach(id => {{
-            try {{
-                const task = Task.byIdentifier(id);
-                if (task) {{
-                    task.completed = true;
-                    results.push({{
-                        success: true,
-                        id: id,
-                        name: task.name
-                    }});
-                }} else {{
-                    results.push({{
-                        success: false,
-                        id: id,
-                        error: "Task not found"
-                    }});
-                }}
-            }} catch (err) {{
-                results.push({{
-                    success: false,
-                    id: id,
-                    error: err.toString()
-                }});
-            }}
-        }});
-        
-        return results;
-    }})()
-    """
+    # Duplicate IDs would only be looked up and completed twice
+    unique_ids = list(dict.fromkeys(task_ids))
     
-    result = run_omnifocus_omnijs(js_code)
+    result = _call_handler("completeTasks", {"ids": unique_ids})
+    _invalidate_caches()
+    if isinstance(result, dict) and result.get("error"):
+        raise RuntimeError(f"Failed to complete tasks: {result['error']}")
     
     successful = [r for r in result if r.get("success")]
     failed = [r for r in result if not r.get("success")]
     
     return {
-        "total": len(task_ids),
+        "total": len(unique_ids),
         "completed": len(successful),
         "failed": len(failed),
         "completed_tasks": [{"id": r["id"], "name": r["name"]} for r in successful],
@@ -919,7 +1781,23 @@ def batch_complete_tasks(task_ids: List[str]) -> Dict[str, Any]:
 
 # ===================== Advanced Features =====================
 
-@mcp.tool()
+_PERSPECTIVES_JS = """
+    (() => {
+        try {
+            return perspectives.map(p => ({
+                id: p.id.primaryKey,
+                name: p.name,
+                isBuiltIn: p.isBuiltIn
+            }));
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """
+
+
+@_tool()
+@_ttl_cache()
 def list_custom_perspectives() -> List[Dict[str, Any]]:
     """
     Lists all available custom perspectives in OmniFocus.
@@ -927,127 +1805,226 @@ def list_custom_perspectives() -> List[Dict[str, Any]]:
     Returns:
         List of perspective dictionaries with id and name.
     """
-    js_code = """
+    result = _submit(_PERSPECTIVES_JS)
+    if isinstance(result, dict) and result.get("error"):
+        raise RuntimeError(f"Failed to list perspectives: {result['error']}")
+    
+    return result if isinstance(result, list) else []
+
+
+_PERSPECTIVE_TASKS_JS = Template("""
     (() => {
-        try {
-            return perspectives.map(p => ({
-                id: p.id.primaryKey,
-                name: p.name,
-                isBuiltIn: p.isBuiltIn
-            }));
+        try {""" + _PACK_JS + """
+            const p = perspectives.byName[$perspective];
+            if (!p) {
+                return { error: "Perspective not found" };
+            }
+            
+            // Note: This is a simplified approach
+            // A full implementation would need to replicate all perspective rules
+            const window = document.windows[0];
+            window.perspective = p;
+            
+            // Get visible tasks from the content tree
+            const tree = window.content;
+            const tasks = [];
+            
+            // Walk the tree depth-first with an explicit stack; children are
+            // pushed in reverse so tasks come out in outline order.
+            const stack = [];
+            if (tree && tree.rootNode && tree.rootNode.children) {
+                const roots = tree.rootNode.children;
+                for (let i = roots.length - 1; i >= 0; i--) {
+                    stack.push(roots[i]);
+                }
+            }
+            
+            while (stack.length) {
+                const item = stack.pop();
+                if (item.object instanceof Task) {
+                    tasks.push(item.object);
+                }
+                const children = item.children;
+                if (children) {
+                    for (let i = children.length - 1; i >= 0; i--) {
+                        stack.push(children[i]);
+                    }
+                }
+            }
+            
+            return pack(tasks, $cols);
         } catch (err) {
             return { error: err.toString() };
         }
     })()
-    """
-    
-    result = run_omnifocus_omnijs(js_code)
-    if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to list perspectives: {result['error']}")
-    
-    return result if isinstance(result, list) else []
+    """)
+
+# Fields the task-returning filters can project. Only the requested ones are
+# read from OmniFocus; notes and tag lists are the expensive ones, so the
+# default leaves them out.
+_TASK_FIELDS = ("id", "name", "note", "completed", "flagged", "project", "tags", "due", "defer")
+_DEFAULT_TASK_FIELDS = ["id", "name", "flagged", "due"]
+
+
+def _task_columns(fields: Optional[List[str]]) -> str:
+    """Validates a requested field list and returns it as a JSON array literal."""
+    if fields is None:
+        return json.dumps(_DEFAULT_TASK_FIELDS)
+    unknown = [f for f in fields if f not in _TASK_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown task fields {unknown}; choose from {', '.join(_TASK_FIELDS)}"
+        )
+    return json.dumps(list(dict.fromkeys(fields)))
 
 
-@mcp.tool()
-def get_custom_perspective_tasks(perspective_name: str) -> List[Dict[str, Any]]:
+@_tool()
+def get_custom_perspective_tasks(
+    perspective_name: str,
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
     """
     Fetches tasks from a named custom perspective.
     
     Args:
         perspective_name: Name of the perspective.
+        fields: Task fields to return, from id, name, note, completed, flagged,
+            project, tags, due and defer. Defaults to id, name, flagged and due.
         
     Returns:
         List of task dictionaries from the perspective.
     """
-    perspective_escaped = perspective_name.replace("'", "\\'")
-    
     # This is a simplified version - the full implementation would need
     # to parse and apply all perspective rules
-    js_code = f"""
-    (() => {{
-        try {{
-            const p = perspectives.byName['{perspective_escaped}'];
-            if (!p) {{
-                return {{ error: "Perspective not found" }};
-            }}
-            
-            // Note: This is a simplified approach
-            // A full implementation would need to replicate all perspective rules
-            const window = document.windows[0];
-            window.perspective = p;
-            
-            // Get visible tasks from the content tree
-            const tree = window.content;
-            const tasks = [];
-            
-            function extractTasks(items) {{
-                items.forEach(item => {{
-                    if (item.object instanceof Task) {{
-                        tasks.push({{
-                            id: item.object.id.primaryKey,
-                            name: item.object.name,
-                            project: item.object.containingProject ? 
-                                     item.object.containingProject.name : null,
-                            due: item.object.effectiveDueDate ? 
-                                 item.object.effectiveDueDate.toISOString() : null,
-                            flagged: item.object.flagged
-                        }});
-                    }}
-                    if (item.children) {{
-                        extractTasks(item.children);
-                    }}
-                }});
-            }}
-            
-            if (tree && tree.rootNode && tree.rootNode.children) {{
-                extractTasks(tree.rootNode.children);
-            }}
-            
-            return tasks;
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
-    """
+    js_code = _build_snippet(
+        _PERSPECTIVE_TASKS_JS,
+        perspective=json.dumps(perspective_name),
+        cols=_task_columns(fields),
+    )
     
-    result = run_omnifocus_omnijs(js_code)
+    result = _submit(js_code)
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to get perspective tasks: {result['error']}")
     
-    return result if isinstance(result, list) else []
+    return _unpack(result)
 
 
-@mcp.tool()
-def filter_tasks(
-    include_completed: bool = False,
-    project_name: Optional[str] = None,
-    has_due_date: Optional[bool] = None,
-    is_flagged: Optional[bool] = None,
-    tag_names: Optional[List[str]] = None,
-    search_text: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+# Text searches matching at most this many mirrored tasks fetch the hits by
+# ID; broader ones fall back to the search predicate inside the script
+_SEARCH_HIT_LIMIT = 200
+
+# A (name, cached ID or None) pair; the script tries the ID first and falls
+# back to matching the name when the ID is unknown or stale
+_NameRef = Tuple[str, Optional[str]]
+
+
+def _filter_domain(
+    project: Optional[_NameRef],
+    tags: Optional[Tuple[_NameRef, ...]],
+    include_completed: bool,
+    task_ids: Optional[Tuple[str, ...]] = None,
+) -> Tuple[str, Optional[str]]:
     """
-    Filters tasks based on various criteria.
+    Picks the smallest task collection OmniFocus can hand filter_tasks directly.
+    
+    OmniJS has no indexed whose() query, so instead of scanning every task
+    in the database this starts from known task IDs (a text search already
+    answered from the mirror), the named project's tasks or the intersection
+    of the named tags' tasks when the filter allows it.
     
-    Args:
-        include_completed: Include completed tasks in results.
-        project_name: Filter by project name.
-        has_due_date: Filter for tasks with/without due dates.
-        is_flagged: Filter for flagged/unflagged tasks.
-        tag_names: Filter by tags (task must have all specified tags).
-        search_text: Search in task names and notes.
-        
     Returns:
-        List of filtered task dictionaries.
+        The JavaScript expression for the candidate tasks, and which of
+        "project" or "tag" it already guarantees (None otherwise).
+    """
+    if task_ids is not None:
+        return f"{json.dumps(list(task_ids))}.map(id => Task.byIdentifier(id)).filter(t => t)", None
+    
+    if project:
+        return f"projectsNamed({json.dumps(project)}).flatMap(p => p.flattenedTasks)", "project"
+    
+    if tags:
+        # Intersect the tags' own task lists, smallest first, so the scan
+        # never grows beyond the rarest tag's tasks
+        tasks = "g.tasks" if include_completed else "(g.remainingTasks || g.tasks)"
+        return (
+            f"""(() => {{
+                const groups = {json.dumps(tags)}.map(ref =>
+                    tagsNamed(ref).flatMap(g => {tasks}));
+                groups.sort((a, b) => a.length - b.length);
+                let candidates = new Map(groups[0].map(t => [t.id.primaryKey, t]));
+                for (let i = 1; i < groups.length && candidates.size; i++) {{
+                    const ids = new Set(groups[i].map(t => t.id.primaryKey));
+                    for (const id of candidates.keys()) {{
+                        if (!ids.has(id)) candidates.delete(id);
+                    }}
+                }}
+                return [...candidates.values()];
+            }})()""",
+            "tag",
+        )
+    
+    return "flattenedTasks", None
+
+
+_FILTER_TASKS_JS = Template("""
+    (() => {
+        try {""" + _PACK_JS + """
+            // Projects and tags are looked up by the ID Python has cached
+            // when it still matches the name, and by name otherwise. Python
+            // only caches names that matched one object, so every name
+            // scanned for is reported back with its ID, or null when it is
+            // shared. A cache hit is not reported, so the entry still expires.
+            const resolved = { project: {}, tag: {} };
+            const named = (kind, byId, all, [name, id]) => {
+                const hit = id ? byId(id) : null;
+                if (hit && hit.name === name) return [hit];
+                const found = all().filter(x => x.name === name);
+                resolved[kind][name] = found.length === 1 ? found[0].id.primaryKey : null;
+                return found;
+            };
+            const projectsNamed = ref =>
+                named("project", id => Project.byIdentifier(id), () => flattenedProjects, ref);
+            const tagsNamed = ref =>
+                named("tag", id => Tag.byIdentifier(id), () => flattenedTags, ref);
+            $setup
+            const result = pack($domain.filter(t => $predicate), $cols);
+            result.resolved = resolved;
+            return result;
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """)
+
+
+@functools.lru_cache(maxsize=64)
+def _filter_tasks_js(
+    include_completed: bool,
+    project: Optional[_NameRef],
+    has_due_date: Optional[bool],
+    is_flagged: Optional[bool],
+    tags: Optional[Tuple[_NameRef, ...]],
+    search_text: Optional[str],
+    cols: str,
+    task_ids: Optional[Tuple[str, ...]] = None,
+) -> str:
+    """
+    Builds the filter_tasks script for one set of criteria.
+    
+    Memoized, so a repeated filter reuses the exact same source string
+    instead of assembling its predicate again.
     """
+    domain, scoped_by = _filter_domain(project, tags, include_completed, task_ids)
+    setup = []
     filters = []
     
+    # Predicates are joined with && cheapest first, so the tag and text
+    # checks below only run on tasks that pass the plain property tests.
     if not include_completed:
         filters.append("!t.completed")
     
-    if project_name:
-        project_escaped = project_name.replace("'", "\\'")
-        filters.append(f"t.containingProject && t.containingProject.name === '{project_escaped}'")
+    if is_flagged is not None:
+        filters.append(f"t.flagged === {_JS_BOOL[is_flagged]}")
     
     if has_due_date is not None:
         if has_due_date:
@@ -1055,73 +2032,135 @@ def filter_tasks(
         else:
             filters.append("t.effectiveDueDate === null")
     
-    if is_flagged is not None:
-        filters.append(f"t.flagged === {json.dumps(is_flagged)}")
+    # A project or tags not already covered by the domain are resolved to ID
+    # sets once up front, so each task only compares IDs. A tag name that
+    # matches nothing means no task can qualify.
+    if project and scoped_by != "project":
+        setup.append(
+            f"const projectIds = new Set(projectsNamed({json.dumps(project)}).map(p => p.id.primaryKey));"
+        )
+        filters.append("t.containingProject && projectIds.has(t.containingProject.id.primaryKey)")
     
-    if tag_names:
-        tag_conditions = []
-        for tag in tag_names:
-            tag_escaped = tag.replace("'", "\\'")
-            tag_conditions.append(f"t.tags.some(tag => tag.name === '{tag_escaped}')")
-        tag_check = " && ".join(tag_conditions)
-        filters.append(f"({tag_check})")
+    other_tags = None if scoped_by == "tag" else tags
+    if other_tags:
+        setup.append(
+            f"const tagIds = {json.dumps(other_tags)}.map(ref => new Set("
+            "tagsNamed(ref).map(g => g.id.primaryKey)));"
+        )
+        setup.append(f"if (tagIds.some(ids => ids.size === 0)) return pack([], {cols});")
+        filters.append("tagIds.every(ids => t.tags.some(g => ids.has(g.id.primaryKey)))")
     
+    # Lowercased once in JS so case folding matches toLowerCase() on names.
+    # Always last: lowercasing names and notes is the costliest test.
     if search_text:
-        search_escaped = search_text.replace("'", "\\'").lower()
+        setup.append(f"const needle = {json.dumps(search_text)}.toLowerCase();")
         filters.append(
-            f"(t.name.toLowerCase().includes('{search_escaped}') || " +
-            f"(t.note && t.note.toLowerCase().includes('{search_escaped}')))"
+            "(t.name.toLowerCase().includes(needle) || " +
+            "(t.note && t.note.toLowerCase().includes(needle)))"
         )
     
     filter_expression = " && ".join(filters) if filters else "true"
     
-    js_code = f"""
-    (() => {{
-        try {{
-            return flattenedTasks.filter(t => {filter_expression}).map(t => ({{
-                id: t.id.primaryKey,
-                name: t.name,
-                note: t.note || "",
-                completed: t.completed,
-                flagged: t.flagged,
-                project: t.containingProject ? t.containingProject.name : null,
-                tags: t.tags.map(tag => tag.name),
-                due: t.effectiveDueDate ? t.effectiveDueDate.toISOString() : null,
-                defer: t.effectiveDeferDate ? t.effectiveDeferDate.toISOString() : null
-            }}));
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
+    return _FILTER_TASKS_JS.substitute(
+        setup="\n            ".join(setup),
+        domain=domain,
+        predicate=filter_expression,
+        cols=cols,
+    )
+
+
+@_tool()
+def filter_tasks(
+    include_completed: bool = False,
+    project_name: Optional[str] = None,
+    has_due_date: Optional[bool] = None,
+    is_flagged: Optional[bool] = None,
+    tag_names: Optional[List[str]] = None,
+    search_text: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
     """
+    Filters tasks based on various criteria.
     
-    result = run_omnifocus_omnijs(js_code)
+    Args:
+        include_completed: Include completed tasks in results.
+        project_name: Filter by project name.
+        has_due_date: Filter for tasks with/without due dates.
+        is_flagged: Filter for flagged/unflagged tasks.
+        tag_names: Filter by tags (task must have all specified tags).
+        search_text: Search in task names and notes.
+        fields: Task fields to return, from id, name, note, completed, flagged,
+            project, tags, due and defer. Defaults to id, name, flagged and due.
+        
+    Returns:
+        List of filtered task dictionaries.
+    """
+    cols = _task_columns(fields)
+    
+    # Remaining tasks are all in the local mirror, whose search text is
+    # already lowercased: answer the text match here and only fetch the hits.
+    # A broad search is left to the script, where one scan beats fetching
+    # every hit by ID.
+    task_ids = None
+    if search_text and not include_completed:
+        hits = _search_mirror(search_text)
+        if not hits:
+            return []
+        if len(hits) <= _SEARCH_HIT_LIMIT:
+            task_ids = tuple(hits)
+            search_text = None
+    
+    # A cached ID stands in for the name only if no other object shares it
+    project = (project_name, _cached_id("project", project_name, unique=True)) if project_name else None
+    tags = (
+        tuple((name, _cached_id("tag", name, unique=True)) for name in tag_names)
+        if tag_names else None
+    )
+    
+    js_code = _filter_tasks_js(
+        include_completed,
+        project,
+        has_due_date,
+        is_flagged,
+        tags,
+        search_text,
+        cols,
+        task_ids,
+    )
+    
+    result = _submit(js_code)
     if isinstance(result, dict) and result.get("error"):
         raise RuntimeError(f"Failed to filter tasks: {result['error']}")
     
-    return result if isinstance(result, list) else []
+    if isinstance(result, dict):
+        for kind, ids in result.get("resolved", {}).items():
+            _remember_ids(kind, ids, unique=True)
+    return _unpack(result)
 
 
 # ===================== Metadata & Export Tools =====================
 
-@mcp.tool()
-def list_projects() -> List[Dict[str, Any]]:
-    """
-    Lists all projects in OmniFocus.
-    
-    Returns:
-        List of project dictionaries.
-    """
-    js_code = """
+# Projects and tags change far less often than clients list them to look up
+# names, so these two listings are kept longer than the per-query TTL.
+_METADATA_TTL = 30.0
+
+
+_LIST_PROJECTS_JS = """
     (() => {
         try {
+            const Status = Project.Status;
+            const STATUS_NAME = new Map([
+                [Status.Active, 'Active'],
+                [Status.OnHold, 'OnHold'],
+                [Status.Dropped, 'Dropped'],
+                [Status.Done, 'Done']
+            ]);
             return projects.map(p => {
-                let statusName = 'Active';
-                if (p.status) {
-                    if (p.status === Project.Status.Active) statusName = 'Active';
-                    else if (p.status === Project.Status.OnHold) statusName = 'OnHold';
-                    else if (p.status === Project.Status.Dropped) statusName = 'Dropped';
-                    else if (p.status === Project.Status.Done) statusName = 'Done';
+                const statusName = STATUS_NAME.get(p.status) || 'Active';
+                const projectTasks = p.tasks;
+                let remaining = 0;
+                for (const t of projectTasks) {
+                    if (!t.completed) remaining++;
                 }
                 return {
                     id: p.id.primaryKey,
@@ -1129,8 +2168,8 @@ def list_projects() -> List[Dict[str, Any]]:
                     status: statusName,
                     folder: p.folder ? p.folder.name : null,
                     sequential: p.sequential,
-                    task_count: p.tasks.length,
-                    remaining_count: p.tasks.filter(t => !t.completed).length,
+                    task_count: projectTasks.length,
+                    remaining_count: remaining,
                     review_interval_days: p.reviewInterval ? p.reviewInterval / (24 * 60 * 60) : null
                 };
             });
@@ -1139,15 +2178,62 @@ def list_projects() -> List[Dict[str, Any]]:
         }
     })()
     """
-    
-    result = run_omnifocus_omnijs(js_code)
+
+_LIST_TAGS_JS = """
+    (() => {
+        try {
+            return tags.map(t => {
+                const tagTasks = t.tasks;
+                let remaining = 0;
+                for (const task of tagTasks) {
+                    if (!task.completed) remaining++;
+                }
+                return {
+                    id: t.id.primaryKey,
+                    name: t.name,
+                    parent: t.parent ? t.parent.name : null,
+                    task_count: tagTasks.length,
+                    remaining_count: remaining
+                };
+            });
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """
+
+
+def _check_listing(kind: str, result: Any) -> List[Dict[str, Any]]:
+    """Validates a project or tag listing and learns its name→ID pairs."""
     if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to list projects: {result['error']}")
+        raise RuntimeError(f"Failed to list {kind}s: {result['error']}")
     
-    return result if isinstance(result, list) else []
+    if not isinstance(result, list):
+        return []
+    
+    # Listings only cover top-level projects and tags, so they cannot
+    # tell whether a name is unique; names repeated within them are skipped
+    ids: Dict[str, Optional[str]] = {}
+    for item in result:
+        ids[item["name"]] = None if item["name"] in ids else item["id"]
+    _remember_ids(kind, ids)
+    return result
+
+
+@_tool()
+@_ttl_cache(ttl=_METADATA_TTL)
+def list_projects() -> List[Dict[str, Any]]:
+    """
+    Lists all projects in OmniFocus.
+    
+    Returns:
+        List of project dictionaries.
+    """
+    return _check_listing("project", _submit(_LIST_PROJECTS_JS))
 
 
-@mcp.tool()
+@_tool()
+@_ttl_cache(ttl=_METADATA_TTL)
 def list_tags() -> List[Dict[str, Any]]:
     """
     Lists all tags in OmniFocus.
@@ -1155,127 +2241,268 @@ def list_tags() -> List[Dict[str, Any]]:
     Returns:
         List of tag dictionaries.
     """
-    js_code = """
-    (() => {
-        try {
-            return tags.map(t => ({
-                id: t.id.primaryKey,
-                name: t.name,
-                parent: t.parent ? t.parent.name : null,
-                task_count: t.tasks.length,
-                remaining_count: t.tasks.filter(task => !task.completed).length
-            }));
-        } catch (err) {
-            return { error: err.toString() };
-        }
-    })()
+    return _check_listing("tag", _submit(_LIST_TAGS_JS))
+
+
+# Queries batch_query can answer. Mirror-backed kinds share one delta sync;
+# the others are sent to OmniFocus together in a single batched script,
+# each with the function that checks and decodes its reply.
+_MIRROR_QUERIES: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+    "inbox": get_inbox_tasks,
+    "flagged": get_flagged_tasks,
+    "forecast": get_forecast_tasks,
+}
+_SCRIPT_QUERIES: Dict[str, Tuple[Callable[[], str], Callable[[Any], List[Dict[str, Any]]]]] = {
+    "projects": (lambda: _LIST_PROJECTS_JS, functools.partial(_check_listing, "project")),
+    "tags": (lambda: _LIST_TAGS_JS, functools.partial(_check_listing, "tag")),
+    "completed_today": (_completed_today_js, _check_completed),
+}
+
+
+@_tool()
+def batch_query(queries: List[str]) -> Dict[str, List[Dict[str, Any]]]:
     """
+    Runs several read-only queries in one OmniFocus round trip.
     
-    result = run_omnifocus_omnijs(js_code)
-    if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to list tags: {result['error']}")
+    Useful for refreshing a dashboard-like view that would otherwise take
+    one call per list.
     
-    return result if isinstance(result, list) else []
+    Args:
+        queries: Query names, any of "inbox", "flagged", "forecast",
+            "completed_today", "projects" and "tags".
+        
+    Returns:
+        Dictionary mapping each requested query name to its results, in the
+        same format as the corresponding single-query tool.
+    """
+    kinds = list(dict.fromkeys(queries))
+    unknown = [k for k in kinds if k not in _MIRROR_QUERIES and k not in _SCRIPT_QUERIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown queries {unknown}; choose from "
+            f"{', '.join([*_MIRROR_QUERIES, *_SCRIPT_QUERIES])}"
+        )
+    
+    # The scripted queries go out as one batch while the mirror syncs, so
+    # the two overlap on the worker pool.
+    scripted = [k for k in kinds if k in _SCRIPT_QUERIES]
+    pending = None
+    if scripted:
+        codes = [_SCRIPT_QUERIES[k][0]() for k in scripted]
+        pending = _executor.submit(run_omnifocus_omnijs_batch, codes)
+    
+    results = {k: _MIRROR_QUERIES[k]() for k in kinds if k in _MIRROR_QUERIES}
+    if pending is not None:
+        for kind, reply in zip(scripted, pending.result()):
+            results[kind] = _SCRIPT_QUERIES[kind][1](reply)
+    
+    return {k: results[k] for k in kinds}
 
 
-@mcp.tool()
-def dump_database(
-    include_completed: bool = False,
-    max_depth: int = 3
-) -> Dict[str, Any]:
+# Argument-free read-only tools parallel_queries can fan out. Its threads
+# outnumber the worker pool on purpose: calls that find both workers busy
+# are coalesced into one batched round trip instead of waiting in line.
+_PARALLEL_QUERIES: Dict[str, Callable[[], Any]] = {
+    fn.__name__: fn
+    for fn in (
+        get_inbox_tasks,
+        get_flagged_tasks,
+        get_forecast_tasks,
+        get_completed_today,
+        list_custom_perspectives,
+        list_projects,
+        list_tags,
+    )
+}
+_query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="omnifocus-query")
+
+
+@_tool()
+def parallel_queries(names: List[str]) -> Dict[str, Any]:
     """
-    Exports a structured dump of the OmniFocus database.
+    Runs several independent query tools concurrently.
     
     Args:
-        include_completed: Include completed items.
-        max_depth: Maximum nesting depth for task hierarchies.
+        names: Tool names, any of get_inbox_tasks, get_flagged_tasks,
+            get_forecast_tasks, get_completed_today, list_custom_perspectives,
+            list_projects and list_tags.
         
     Returns:
-        Dictionary containing projects, tags, and inbox tasks.
+        Dictionary mapping each tool name to its result.
     """
-    js_code = f"""
-    (() => {{
-        try {{
-            const includeCompleted = {json.dumps(include_completed)};
-            const maxDepth = {max_depth};
+    names = list(dict.fromkeys(names))
+    unknown = [n for n in names if n not in _PARALLEL_QUERIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown queries {unknown}; choose from {', '.join(_PARALLEL_QUERIES)}"
+        )
+    
+    futures = {_query_executor.submit(_PARALLEL_QUERIES[n]): n for n in names}
+    results = {}
+    for future in as_completed(futures):
+        results[futures[future]] = future.result()
+    
+    return {n: results[n] for n in names}
+
+
+_DUMP_DATABASE_JS = Template("""
+    (() => {
+        try {
+            const includeCompleted = $include_completed;
+            const maxDepth = $max_depth;
+            const includeNote = $include_note;
+            const includeTags = $include_tags;
             
-            function mapTask(task, depth = 0) {{
-                if (depth >= maxDepth) return null;
-                if (!includeCompleted && task.completed) return null;
-                
-                const children = task.children
-                    .map(child => mapTask(child, depth + 1))
-                    .filter(c => c !== null);
-                
-                return {{
-                    id: task.id.primaryKey,
-                    name: task.name,
-                    completed: task.completed,
-                    flagged: task.flagged,
-                    note: task.note || "",
-                    tags: task.tags.map(t => t.name),
-                    due: task.dueDate ? task.dueDate.toISOString() : null,
-                    defer: task.deferDate ? task.deferDate.toISOString() : null,
-                    children: children
-                }};
-            }}
+            // Each top-level collection is materialized once and reused
+            const PS = projects;
+            const TS = tags;
+            const FT = flattenedTasks;
+            const ACTIVE = Project.Status.Active;
             
-            const projectsData = projects.map(p => {{
-                const tasks = p.rootTask.children
-                    .map(t => mapTask(t, 0))
-                    .filter(t => t !== null);
+            // Maps task subtrees with an explicit work stack of
+            // [task, depth, siblings] entries. Each record is appended to its
+            // parent's children when popped; pushing in reverse keeps order.
+            // Children are only read while the depth budget allows, so the
+            // deeper levels of the outline are never touched.
+            function mapTasks(roots) {
+                const out = [];
+                const stack = [];
+                for (let i = roots.length - 1; i >= 0; i--) {
+                    stack.push([roots[i], 0, out]);
+                }
                 
-                return {{
+                while (stack.length) {
+                    const [task, depth, siblings] = stack.pop();
+                    if (!includeCompleted && task.completed) continue;
+                    
+                    const record = {
+                        id: task.id.primaryKey,
+                        name: task.name,
+                        completed: task.completed,
+                        flagged: task.flagged,
+                        ...(includeNote ? { note: task.note || "" } : {}),
+                        ...(includeTags ? { tags: task.tags.map(t => t.name) } : {}),
+                        due: task.dueDate ? task.dueDate.toISOString() : null,
+                        defer: task.deferDate ? task.deferDate.toISOString() : null,
+                        children: []
+                    };
+                    siblings.push(record);
+                    if (depth + 1 >= maxDepth) continue;
+                    
+                    const children = task.children;
+                    for (let i = children.length - 1; i >= 0; i--) {
+                        stack.push([children[i], depth + 1, record.children]);
+                    }
+                }
+                return out;
+            }
+            
+            // One flat list of tagged records, so the worker can stream it
+            // back in chunks instead of as a single nested object
+            const records = [];
+            let activeProjects = 0;
+            for (const p of PS) {
+                const status = p.status;
+                if (status === ACTIVE) activeProjects++;
+                records.push({
+                    kind: "project",
                     id: p.id.primaryKey,
                     name: p.name,
-                    status: p.status.name,
+                    status: status.name,
                     sequential: p.sequential,
                     folder: p.folder ? p.folder.name : null,
-                    tasks: tasks
-                }};
-            }});
+                    tasks: maxDepth > 0 ? mapTasks(p.rootTask.children) : []
+                });
+            }
             
-            const tagsData = tags.map(t => ({{
-                id: t.id.primaryKey,
-                name: t.name,
-                parent: t.parent ? t.parent.name : null
-            }}));
+            for (const t of TS) {
+                records.push({
+                    kind: "tag",
+                    id: t.id.primaryKey,
+                    name: t.name,
+                    parent: t.parent ? t.parent.name : null
+                });
+            }
             
-            const inboxData = inbox.tasks
-                .map(t => mapTask(t, 0))
-                .filter(t => t !== null);
+            for (const task of maxDepth > 0 ? mapTasks(inbox.tasks) : []) {
+                task.kind = "inbox";
+                records.push(task);
+            }
             
-            return {{
-                projects: projectsData,
-                tags: tagsData,
-                inbox: inboxData,
-                stats: {{
-                    total_projects: projects.length,
-                    active_projects: projects.filter(p => p.status === Project.Status.Active).length,
-                    total_tasks: flattenedTasks.length,
-                    remaining_tasks: flattenedTasks.filter(t => !t.completed).length,
-                    flagged_tasks: flattenedTasks.filter(t => !t.completed && t.flagged).length
-                }}
-            }};
-        }} catch (err) {{
-            return {{ error: err.toString() }};
-        }}
-    }})()
+            // Count the remaining task stats in one pass over the database
+            let remainingTasks = 0, flaggedTasks = 0;
+            for (const t of FT) {
+                if (!t.completed) {
+                    remainingTasks++;
+                    if (t.flagged) flaggedTasks++;
+                }
+            }
+            
+            records.push({
+                kind: "stats",
+                total_projects: PS.length,
+                active_projects: activeProjects,
+                total_tasks: FT.length,
+                remaining_tasks: remainingTasks,
+                flagged_tasks: flaggedTasks
+            });
+            return records;
+        } catch (err) {
+            return { error: err.toString() };
+        }
+    })()
+    """)
+
+# Section of the dump_database result each streamed record kind belongs to
+_DUMP_SECTIONS = {"project": "projects", "tag": "tags", "inbox": "inbox"}
+
+
+@_tool()
+def dump_database(
+    include_completed: bool = False,
+    max_depth: int = 3,
+    include_note: bool = True,
+    include_tags: bool = True,
+) -> Dict[str, Any]:
     """
+    Exports a structured dump of the OmniFocus database.
     
-    result = run_omnifocus_omnijs(js_code)
-    if isinstance(result, dict) and result.get("error"):
-        raise RuntimeError(f"Failed to dump database: {result['error']}")
-    
-    # Ensure we return a dict as declared
-    if not isinstance(result, dict):
-        raise RuntimeError(f"Unexpected result type: {type(result)}")
+    Args:
+        include_completed: Include completed items.
+        max_depth: Maximum nesting depth for task hierarchies.
+        include_note: Include each task's note. Notes and tag lists are the
+            costliest fields to read; turn them off for a faster outline.
+        include_tags: Include each task's tag names.
+        
+    Returns:
+        Dictionary containing projects, tags, and inbox tasks.
+    """
+    js_code = _build_snippet(
+        _DUMP_DATABASE_JS,
+        include_completed=_JS_BOOL[include_completed],
+        max_depth=str(int(max_depth)),
+        include_note=_JS_BOOL[include_note],
+        include_tags=_JS_BOOL[include_tags],
+    )
+    
+    dump: Dict[str, Any] = {"projects": [], "tags": [], "inbox": [], "stats": {}}
+    for record in run_omnifocus_omnijs_stream(js_code):
+        if not isinstance(record, dict) or "kind" not in record:
+            if isinstance(record, dict) and record.get("error"):
+                raise RuntimeError(f"Failed to dump database: {record['error']}")
+            raise RuntimeError(f"Unexpected result type: {type(record)}")
+        
+        kind = record.pop("kind")
+        if kind == "stats":
+            dump["stats"] = record
+        else:
+            dump[_DUMP_SECTIONS[kind]].append(record)
     
-    return result
+    return dump
 
 
 # ===================== Main Entry Point =====================
 
 if __name__ == "__main__":
     # Run the MCP server
-    mcp.run()
\ No newline at end of file
+    _get_server().run()
\ No newline at end of file
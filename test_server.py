@@ -7,19 +7,256 @@ Can be run with pytest or directly as a script.
 
 import sys
 import os
+import json
+import re
+import threading
+import time
 import pytest
+from contextlib import contextmanager
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+import omnifocus_server
 from omnifocus_server import (
+    _parse_review_interval,
     run_omnifocus_omnijs,
     add_task,
     get_inbox_tasks,
     get_flagged_tasks,
+    get_dashboard,
+    batch_query,
+    parallel_queries,
     list_projects,
     list_tags,
+    filter_tasks,
+    add_project,
 )
 
 
+@contextmanager
+def stub_omnifocus(reply):
+    """Answers OmniJS snippets with reply(code) instead of OmniFocus, with cold caches."""
+    original = omnifocus_server.run_omnifocus_omnijs
+    omnifocus_server.run_omnifocus_omnijs = reply
+    omnifocus_server._name_ids.clear()
+    omnifocus_server._mirror.clear()
+    omnifocus_server._mirror_synced = None
+    omnifocus_server._invalidate_caches()
+    try:
+        yield
+    finally:
+        omnifocus_server.run_omnifocus_omnijs = original
+        omnifocus_server._name_ids.clear()
+        omnifocus_server._invalidate_caches()
+
+
+def test_parse_review_interval():
+    """Test review interval parsing (no OmniFocus needed)."""
+    day = 24 * 60 * 60
+    assert _parse_review_interval("1 week") == 7 * day
+    assert _parse_review_interval("2 days") == 2 * day
+    assert _parse_review_interval("3 Months") == 90 * day
+    assert _parse_review_interval("weekly") == 7 * day
+    assert _parse_review_interval("0 days") == day
+    assert _parse_review_interval("1.5 weeks") == 7 * day
+    assert _parse_review_interval("10 business days") == 10 * day
+    assert _parse_review_interval("fortnight") is None
+    print("✓ Review intervals parse correctly")
+
+
+def test_filter_tasks_duplicate_names():
+    """Test that shared project names match every project, cold or warm (no OmniFocus needed)."""
+    projects = {"w1": "Work", "w2": "Work", "s1": "Solo"}
+    tasks = {"w1": ["t1"], "w2": ["t2"], "s1": ["t3"]}
+    scripts = []
+    
+    def reply(code):
+        scripts.append(code)
+        if code == omnifocus_server._LIST_PROJECTS_JS:
+            return [{"id": pid, "name": name} for pid, name in projects.items()]
+        if "new Project(" in code:
+            pid = f"p{len(projects)}"
+            projects[pid], tasks[pid] = "Solo", ["t4"]
+            return {"success": True, "id": pid, "name": "Solo"}
+        # Mirrors named() in the filter script: a cached ID that still has
+        # the name is used as is, anything else is scanned for and reported
+        name, cached = json.loads(re.search(r"projectsNamed\((\[.*?\])\)", code).group(1))
+        resolved = {}
+        if projects.get(cached) == name:
+            found = [cached]
+        else:
+            found = [pid for pid, pname in projects.items() if pname == name]
+            resolved[name] = found[0] if len(found) == 1 else None
+        rows = [[tid] for pid in found for tid in tasks[pid]]
+        return {"cols": ["id"], "rows": rows, "resolved": {"project": resolved, "tag": {}}}
+    
+    def task_ids(project_name):
+        return [t["id"] for t in filter_tasks(project_name=project_name)]
+    
+    with stub_omnifocus(reply):
+        for _ in range(2):
+            assert task_ids("Work") == ["t1", "t2"]
+        list_projects()
+        assert task_ids("Work") == ["t1", "t2"]
+        
+        # A name matching a single project is cached for the next call, and
+        # using the cached ID does not refresh the entry
+        assert task_ids("Solo") == ["t3"]
+        learned = omnifocus_server._name_ids[("project", "Solo")]
+        assert task_ids("Solo") == ["t3"]
+        assert '["Solo", "s1"]' in scripts[-1]
+        assert omnifocus_server._name_ids[("project", "Solo")] == learned
+        
+        # A new project sharing the name makes the cached ID incomplete
+        add_project("Solo")
+        assert task_ids("Solo") == ["t3", "t4"]
+        assert '["Solo", null]' in scripts[-1]
+    print("✓ Duplicate project names stay fully matched")
+
+
+def test_mirror_sync():
+    """Test full, delta and pruning syncs of the task mirror (no OmniFocus needed)."""
+    db = {
+        "t1": {"name": "Report", "project": "Work", "modified": 1},
+        "t2": {"name": "Email", "project": "Work", "modified": 1},
+    }
+    clock = [10]
+    sinces = []
+    id_scans = []
+    
+    def reply(code):
+        if code == omnifocus_server._MIRROR_IDS_JS:
+            id_scans.append(code)
+            return list(db)
+        if "project.name = " in code:
+            return {"success": True, "id": "p1", "name": "Home"}
+        since = int(re.search(r"const since = (\d+);", code).group(1))
+        sinces.append(since)
+        rows = [
+            [tid, t["name"], "", False, False, t["project"], None, None, False]
+            for tid, t in db.items() if t["modified"] >= since
+        ]
+        return {"cols": omnifocus_server._MIRROR_COLS, "rows": rows, "now": clock[0], "in_scope": len(db)}
+    
+    def mirrored():
+        omnifocus_server._invalidate_caches()  # makes the next read sync again
+        return {t["id"]: t for t in omnifocus_server._mirrored_tasks()}
+    
+    with stub_omnifocus(reply):
+        assert set(mirrored()) == {"t1", "t2"} and sinces == [0]
+        
+        # Only tasks modified since the last sync are pulled
+        db["t2"].update(name="Email Bob", modified=11)
+        clock[0] = 12
+        assert mirrored()["t2"]["name"] == "Email Bob"
+        assert sinces[-1] == 10
+        
+        # A deleted task never shows up as modified; the ID scan prunes it
+        del db["t1"]
+        assert set(mirrored()) == {"t2"} and len(id_scans) == 1
+        
+        # Renaming a project leaves its tasks' modified dates alone
+        db["t2"]["project"] = "Home"
+        omnifocus_server.edit_project("p1", name="Home")
+        assert mirrored()["t2"]["project"] == "Home"
+        assert sinces[-1] == 0
+    print("✓ Task mirror syncs deltas, prunes deletions and resyncs after renames")
+
+
+def test_coalescer_batches_and_isolates_errors():
+    """Test that queued snippets share a round trip and fail independently (no OmniFocus needed)."""
+    calls = []
+    release = threading.Event()
+    
+    def reply(code):
+        calls.append(code)
+        if code == "'lead'":
+            release.wait(5)
+            return "lead"
+        snippets = sorted(["'one'", "'bad'", "'two'"], key=code.index)
+        return [{"error": "boom"} if s == "'bad'" else {"ok": True, "result": s.strip("'")} for s in snippets]
+    
+    coalescer = omnifocus_server._Coalescer(max_flushers=1)
+    results = {}
+    
+    def submit(code):
+        try:
+            results[code] = coalescer.submit(code)
+        except RuntimeError as exc:
+            results[code] = exc
+    
+    with stub_omnifocus(reply):
+        leader = threading.Thread(target=submit, args=("'lead'",))
+        leader.start()
+        while not calls:
+            time.sleep(0.01)
+        followers = [threading.Thread(target=submit, args=(code,)) for code in ("'one'", "'bad'", "'two'")]
+        for thread in followers:
+            thread.start()
+        while len(coalescer._pending) < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+    
+    assert len(calls) == 2, f"Expected the followers in one batch, got {len(calls)} round trips"
+    assert results["'lead'"] == "lead"
+    assert results["'one'"] == "one" and results["'two'"] == "two"
+    assert isinstance(results["'bad'"], RuntimeError) and "boom" in str(results["'bad'"])
+    print("✓ Coalescer batches queued snippets and isolates their errors")
+
+
+def test_ttl_cache_invalidation():
+    """Test that cached results are reused until _db_version moves (no OmniFocus needed)."""
+    calls = []
+    
+    @omnifocus_server._ttl_cache(ttl=60)
+    def query(name, flagged=False):
+        calls.append((name, flagged))
+        return len(calls)
+    
+    assert query("a") == query("a", flagged=False) == 1
+    assert query("b") == 2
+    omnifocus_server._invalidate_caches()
+    assert query("a") == 3
+    print("✓ TTL cache is invalidated by database edits")
+
+
+def test_filter_tasks_js():
+    """Test the generated filter_tasks scripts (no OmniFocus needed)."""
+    cols = omnifocus_server._task_columns(None)
+    build = omnifocus_server._filter_tasks_js
+    
+    script = build(False, ("Work", None), None, True, None, "Milk", cols)
+    assert 'projectsNamed(["Work", null]).flatMap(p => p.flattenedTasks).filter(' in script
+    assert "projectIds" not in script
+    predicate = script[script.index(".filter(t => "):]
+    assert predicate.index("!t.completed") < predicate.index("t.flagged === true") < predicate.index("needle")
+    
+    script = build(False, None, None, None, (("a", "g1"), ("b", None)), None, cols)
+    assert '[["a", "g1"], ["b", null]].map(ref =>' in script
+    assert "g.remainingTasks" in script and "tagIds" not in script
+    
+    script = build(True, ("Work", "p1"), False, None, None, None, cols, ("t1", "t2"))
+    assert '["t1", "t2"].map(id => Task.byIdentifier(id))' in script
+    assert "projectIds" in script and "t.effectiveDueDate === null" in script
+    assert "!t.completed" not in script and "needle" not in script
+    print("✓ Filter scripts pick the right domain and predicates")
+
+
+def test_transport_line_and_unpack():
+    """Test transport text and pack() table helpers (no OmniFocus needed)."""
+    line = omnifocus_server._transport_line(
+        {"name": "Call\nBob", "project": "Work", "tags": ["phone"], "due_date": "today", "flagged": True}
+    )
+    assert line == "Call Bob ::Work @phone #today !"
+    assert omnifocus_server._transport_line({"name": "Plain", "flagged": False}) == "Plain"
+    
+    table = {"cols": ["id", "name"], "rows": [["1", "a"], ["2", "b"]]}
+    assert omnifocus_server._unpack(table) == [{"id": "1", "name": "a"}, {"id": "2", "name": "b"}]
+    assert omnifocus_server._unpack({"error": "x"}) == []
+    print("✓ Transport lines and packed tables are built correctly")
+
+
 def test_omnijs_execution():
     """Test basic OmniJS execution."""
     result = run_omnifocus_omnijs("(() => { return 'Hello from OmniFocus'; })()")
@@ -62,6 +299,36 @@ def test_query_flagged():
         print(f"  First flagged task: {tasks[0].get('name', 'Unknown')}")
 
 
+def test_dashboard():
+    """Test fetching the combined dashboard views."""
+    dashboard = get_dashboard()
+    assert set(dashboard) == {'inbox', 'flagged', 'forecast', 'completed_today'}, \
+        f"Unexpected dashboard views: {sorted(dashboard)}"
+    for view, tasks in dashboard.items():
+        assert isinstance(tasks, list), f"Expected list for {view}, got {type(tasks)}"
+    print(f"✓ Dashboard: " + ", ".join(f"{len(t)} {v}" for v, t in dashboard.items()))
+
+
+def test_batch_query():
+    """Test running several queries in one call."""
+    results = batch_query(['projects', 'inbox', 'tags'])
+    assert list(results) == ['projects', 'inbox', 'tags'], \
+        f"Unexpected queries: {list(results)}"
+    for query, items in results.items():
+        assert isinstance(items, list), f"Expected list for {query}, got {type(items)}"
+    print(f"✓ Batch query: " + ", ".join(f"{len(r)} {q}" for q, r in results.items()))
+
+
+def test_parallel_queries():
+    """Test running independent queries concurrently."""
+    names = ['get_inbox_tasks', 'get_flagged_tasks', 'list_projects', 'list_tags']
+    results = parallel_queries(names)
+    assert list(results) == names, f"Unexpected queries: {list(results)}"
+    for name, items in results.items():
+        assert isinstance(items, list), f"Expected list for {name}, got {type(items)}"
+    print(f"✓ Parallel queries: " + ", ".join(f"{len(r)} from {n}" for n, r in results.items()))
+
+
 def test_list_projects():
     """Test listing projects."""
     projects = list_projects()
@@ -93,10 +360,20 @@ def main():
     print("=" * 50)
     
     tests = [
+        test_parse_review_interval,
+        test_filter_tasks_duplicate_names,
+        test_mirror_sync,
+        test_coalescer_batches_and_isolates_errors,
+        test_ttl_cache_invalidation,
+        test_filter_tasks_js,
+        test_transport_line_and_unpack,
         test_omnijs_execution,
         test_create_task,
         test_query_inbox,
         test_query_flagged,
+        test_dashboard,
+        test_batch_query,
+        test_parallel_queries,
         test_list_projects,
         test_list_tags,
     ]